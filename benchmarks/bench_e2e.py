@@ -0,0 +1,181 @@
+#!/usr/local/bin/python3
+"""
+End to end benchmarks of tlog on a synthetic journal made by journalgen.py, from parsing a document up to a full
+tlog.py run.  Each benchmark is repeated, with any setup it needs (such as a fresh copy of the journal tree for
+the benchmarks that change it) done outside the timing, and the results are saved as JSON for
+compare_results.py to compare across commits:
+    {"meta": {...}, "benchmarks": {name: {"repeat", "times_s", "median_s", "iqr_s", "min_s"}}}
+
+Run from the repository root with the tlog modules on the path, as the unit tests are:
+    PYTHONPATH=tlog python benchmarks/bench_e2e.py [--repeat N] [--output results.json] [--only name ...]
+"""
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import journaldir
+import tlog
+from fsendeavor import FileSystemDomain
+from journalgen import generate_journal
+from tlconst import apCfg
+from tldocument import BlotterDocument
+
+TLOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tlog")
+
+
+class JournalTree:
+    """
+    Generates the same journal for each benchmark that reads or changes one.  The trees are generated rather
+    than copied because full storySource: paths point into the tree they were written in.
+    """
+
+    def __init__(self, work_dir, sizes, relative_story_source=False):
+        self.work_dir = work_dir
+        self.sizes = sizes
+        self.relative_story_source = relative_story_source
+        self.today = datetime.datetime.now()
+        self.tree_n = 0
+
+    def fresh_copy(self) -> dict:
+        """:return: the paths of a newly generated journal, as generate_journal() returns them"""
+        self.tree_n += 1
+        return generate_journal(os.path.join(self.work_dir, f"tree{self.tree_n}"), *self.sizes, today=self.today,
+                                relative_story_source=self.relative_story_source)
+
+
+def user_paths_for(tree: dict) -> journaldir.UserPaths:
+    return journaldir.UserPaths(tree["journal_root"], tree["tmp_root"], tree["endeavor_path"])
+
+
+def all_story_text(tree: dict) -> str:
+    story_texts = []
+    for dir_path, _, file_names in sorted(os.walk(tree["endeavor_path"])):
+        story_texts += [journaldir.read_file_str(os.path.join(dir_path, file_name))
+                        for file_name in sorted(file_names) if apCfg.story_pat.match(file_name)]
+    return "\n".join(story_texts)
+
+
+def old_blotter_state(tree: dict) -> dict:
+    """Load the latest blotter as tlog.main() does before writing the resolved tasks"""
+    user_paths = user_paths_for(tree)
+    daily_o = journaldir.Daily(tree["journal_root"])
+    os.makedirs(daily_o.jrdir, exist_ok=True)
+    task_load_result = tlog.load_task_data(daily_o, user_paths)
+    return {"user_paths": user_paths, "daily_o": daily_o, "old_blotter_doc": task_load_result.data}
+
+
+def update_endeavors_state(tree: dict) -> dict:
+    state = old_blotter_state(tree)
+    new_blotter_doc = tlog.write_resolved_tasks(state["daily_o"], state["old_blotter_doc"], tree["endeavor_path"])
+    state["resolved_items"] = \
+        new_blotter_doc.scrum.head_instance_dict[new_blotter_doc.resolved_section_head].body_items
+    state["user_paths"].git_init_journal()
+    return state
+
+
+def run_tlog_main(tree: dict):
+    env = dict(os.environ, JOURNAL_PATH=tree["journal_root"], TLOG_TMP=tree["tmp_root"],
+               TLOG_RELATIVE_STORY_SOURCE=str(int(tree["relative_story_source"])), PYTHONPATH=TLOG_DIR)
+    subprocess.run([sys.executable, os.path.join(TLOG_DIR, "tlog.py")], env=env, check=True,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def benchmark_table(journal_tree: JournalTree):
+    """
+    :return: list of (name, setup, run).  setup() is called before each timed run(state) with its result;
+    setups that return a working copy are for benchmarks that change the journal.
+    """
+    read_only_tree = journal_tree.fresh_copy()
+    story_text = all_story_text(read_only_tree)
+    story_doc = BlotterDocument.fromtext(story_text)
+    FileSystemDomain(user_paths_for(read_only_tree))  # saves the story doc cache for the warm load
+    effort_domain = FileSystemDomain(user_paths_for(read_only_tree)).as_domain()
+
+    def cold_cache_paths():
+        journaldir.remove_filepath(user_paths_for(read_only_tree).story_cache_file)
+        return user_paths_for(read_only_tree)
+
+    return [
+        ("BlotterDocument.fromtext", lambda: story_text, BlotterDocument.fromtext),
+        ("str(BlotterDocument)", lambda: story_doc, str),
+        ("FileSystemDomain load cold cache", cold_cache_paths, FileSystemDomain),
+        ("FileSystemDomain load warm cache", lambda: user_paths_for(read_only_tree), FileSystemDomain),
+        ("EffortDomain.get_sprints", lambda: effort_domain, lambda domain: domain.get_sprints(1)),
+        ("write_resolved_tasks", lambda: old_blotter_state(journal_tree.fresh_copy()),
+         lambda state: tlog.write_resolved_tasks(state["daily_o"], state["old_blotter_doc"],
+                                                 state["user_paths"].endeavor_path)),
+        ("update_endeavors", lambda: update_endeavors_state(journal_tree.fresh_copy()),
+         lambda state: tlog.update_endeavors(state["daily_o"], "benchmark", state["old_blotter_doc"],
+                                             state["resolved_items"], state["user_paths"])),
+        ("tlog.main", journal_tree.fresh_copy, run_tlog_main),
+    ]
+
+
+def time_benchmark(setup, run, repeat) -> dict:
+    times = []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):  # tlog prints what it does
+            state = setup()
+            start = time.perf_counter()
+            run(state)
+            times.append(time.perf_counter() - start)
+    quartiles = statistics.quantiles(times, n=4) if len(times) > 1 else [times[0]] * 3
+    return {"repeat": repeat, "times_s": times, "median_s": statistics.median(times),
+            "iqr_s": quartiles[2] - quartiles[0], "min_s": min(times)}
+
+
+def run_meta(args) -> dict:
+    try:
+        commit = subprocess.run(["git", "-C", os.path.dirname(TLOG_DIR), "rev-parse", "HEAD"],
+                                capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {"commit": commit, "date": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "repeat": args.repeat,
+            "endeavors": args.endeavors, "stories": args.stories, "tasks": args.tasks, "months": args.months,
+            "relative_story_source": args.relative_story_source}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--endeavors", type=int, default=5)
+    parser.add_argument("--stories", type=int, default=20, help="stories per endeavor")
+    parser.add_argument("--tasks", type=int, default=15, help="tasks per story")
+    parser.add_argument("--months", type=int, default=24, help="months of blotters and resolved files")
+    parser.add_argument("--output", default="bench_e2e.json", help="JSON results file")
+    parser.add_argument("--only", nargs="*", help="run only the benchmarks with these names")
+    parser.add_argument("--relative-story-source", action="store_true",
+                        help="benchmark with an_endeavor/story.md storySource: values (TLOG_RELATIVE_STORY_SOURCE=1)")
+    args = parser.parse_args()
+
+    results = {"meta": run_meta(args), "benchmarks": {}}
+    saved_relative_story_source = apCfg.relative_story_source
+    apCfg.relative_story_source = args.relative_story_source
+    try:
+        with tempfile.TemporaryDirectory(prefix="tlog-bench-") as work_dir:
+            journal_tree = JournalTree(work_dir, (args.endeavors, args.stories, args.tasks, args.months),
+                                       args.relative_story_source)
+            for name, setup, run in benchmark_table(journal_tree):
+                if args.only and name not in args.only:
+                    continue
+                result = time_benchmark(setup, run, args.repeat)
+                results["benchmarks"][name] = result
+                print(f"{name:36} median {result['median_s'] * 1000:9.2f} ms  iqr {result['iqr_s'] * 1000:8.2f} ms")
+    finally:
+        apCfg.relative_story_source = saved_relative_story_source
+    journaldir.write_filepath(json.dumps(results, indent=2) + "\n", args.output)
+    print(f"results: {args.output}")
+
+
+if __name__ == '__main__':
+    main()
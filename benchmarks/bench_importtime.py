@@ -0,0 +1,52 @@
+#!/usr/local/bin/python3
+"""
+Times importing tlog modules with python -X importtime, each in a fresh interpreter, and lists the slowest imports
+they pull in.  GitPython (git) and pymongo should not appear: they are imported on first use.
+
+Run from the repository root:
+    python benchmarks/bench_importtime.py [module ...]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+TLOG_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tlog")
+LAZY_MODULES = ("git", "pymongo")
+
+
+def import_times(module_name):
+    """
+    Import module_name in a new python process.
+    :return: dict of imported module name to cumulative import time in microseconds
+    """
+    env = dict(os.environ, PYTHONPATH=TLOG_DIR)
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module_name}"],
+                            env=env, stderr=subprocess.PIPE, stdout=subprocess.DEVNULL, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, imported = line[len("import time:"):].split("|")
+        times[imported.strip()] = int(cumulative)
+    return times
+
+
+def main():
+    module_names = sys.argv[1:] or ["tlog", "journaldir"]
+    runs = 7
+    import_times(module_names[0])  # the first run also compiles the .pyc files
+    for module_name in module_names:
+        runs_times = [import_times(module_name) for _ in range(runs)]
+        median_ms = statistics.median(times[module_name] for times in runs_times) / 1000
+        print(f"{module_name}: median import {median_ms:.1f} ms over {runs} runs")
+        slowest = sorted(runs_times[-1].items(), key=lambda name_time: name_time[1], reverse=True)[1:6]
+        for imported, cumulative in slowest:
+            print(f"    {imported}: {cumulative / 1000:.1f} ms")
+        eager = [lazy for lazy in LAZY_MODULES if lazy in runs_times[-1]]
+        if eager:
+            print(f"    imported eagerly: {', '.join(eager)}")
+
+
+if __name__ == '__main__':
+    main()
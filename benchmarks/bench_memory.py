@@ -0,0 +1,49 @@
+#!/usr/local/bin/python3
+"""
+Measures the memory held by parsed documents, reported as bytes per Item.
+
+Run from the repository root with the tlog modules on the path, as the unit tests are:
+    PYTHONPATH=tlog python benchmarks/bench_memory.py [number of items]
+"""
+import gc
+import sys
+import tracemalloc
+
+from tldocument import BlotterDocument
+
+
+def make_story_text(num_items, items_per_section=40):
+    """A story like document where every task has a storySource and titleHash attribute and some detail lines"""
+    lines = []
+    for n in range(num_items):
+        if n % items_per_section == 0:
+            lines.append(f"# Section {n // items_per_section}")
+        lines += [f"d - task number {n}",
+                  f"storySource:/home/user/journal/Endeavors/goal/story {n % 50}.md",
+                  f"titleHash:{n:010d}",
+                  " - a detail line",
+                  "free text about the task"]
+    return "\n".join(lines)
+
+
+def bytes_per_item(num_items):
+    """:return: the memory allocated while parsing and holding a document of num_items Items, per Item"""
+    text = make_story_text(num_items)
+    gc.collect()
+    tracemalloc.start()
+    start, _ = tracemalloc.get_traced_memory()
+    doc = BlotterDocument.fromtext(text)
+    gc.collect()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    item_count = sum(len(section.body_items) for section in doc.journal)
+    return (held - start) / item_count
+
+
+def main():
+    num_items = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print(f"items: {num_items} bytes per item: {bytes_per_item(num_items):.0f}")
+
+
+if __name__ == '__main__':
+    main()
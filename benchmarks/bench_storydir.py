@@ -0,0 +1,44 @@
+#!/usr/local/bin/python3
+"""
+Times journaldir.StoryDir construction for an endeavor with many stories, half of them listed in prioritized.md.
+The cold time is that of a tlog.py run, which constructs each StoryDir once: prioritized.md is read and split.  The
+warm time is that of constructing it again in the same process, with the order from journaldir.priority_order_cache.
+
+Run from the repository root with the tlog modules on the path, as the unit tests are:
+    PYTHONPATH=tlog python benchmarks/bench_storydir.py [number of stories] [endeavor dir to create]
+"""
+import os
+import sys
+import tempfile
+import timeit
+
+import journaldir
+
+
+def make_endeavor_dir(endeavor_dir, num_stories):
+    """Write num_stories empty story files, and a prioritized.md listing every other one in reverse order"""
+    os.makedirs(endeavor_dir, exist_ok=True)
+    story_names = [f"story {n:05d} story.md" for n in range(num_stories)]
+    for story_name in story_names:
+        open(os.path.join(endeavor_dir, story_name), 'w').close()
+    journaldir.write_filepath("\n".join(reversed(story_names[::2])), os.path.join(endeavor_dir, "prioritized.md"))
+
+
+def main():
+    num_stories = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    endeavor_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(tempfile.mkdtemp(), "bigEndeavor")
+    make_endeavor_dir(endeavor_dir, num_stories)
+    runs = 20
+
+    def cold_story_dir():
+        journaldir.priority_order_cache.clear()
+        return journaldir.StoryDir(endeavor_dir)
+
+    cold_seconds = timeit.timeit(cold_story_dir, number=runs) / runs
+    warm_seconds = timeit.timeit(lambda: journaldir.StoryDir(endeavor_dir), number=runs) / runs
+    print(f"stories: {num_stories} StoryDir construction cold: {cold_seconds * 1000:.2f} ms"
+          f"  warm (priority order cached): {warm_seconds * 1000:.2f} ms")
+
+
+if __name__ == '__main__':
+    main()
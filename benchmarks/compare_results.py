@@ -0,0 +1,96 @@
+#!/usr/local/bin/python3
+"""
+Compares two benchmark result files written by bench_e2e.py, a baseline and a candidate, and exits with status 1
+if any benchmark regressed.
+
+A benchmark has regressed when its candidate median is slower than the baseline median by more than
+--threshold (a fraction of the baseline median), and by more than --noise times the larger of the two
+interquartile ranges, so a slowdown within the spread of the repeats is not reported.  Differences below
+--min-delta-ms are ignored.  Medians with fewer than --min-repeat repeats are reported but never fail the gate,
+nor do benchmarks with no repeats at all.
+
+Run from the repository root:
+    python benchmarks/compare_results.py baseline.json candidate.json [--threshold 0.1] [--noise 1.5]
+"""
+import argparse
+import json
+import statistics
+import sys
+
+
+def load_times(results_file) -> dict:
+    """:return: dict of benchmark name to its list of times in seconds"""
+    with open(results_file) as results_fd:
+        results = json.load(results_fd)
+    return {name: result["times_s"] for name, result in results["benchmarks"].items()}
+
+
+def median_iqr(times):
+    """:return: (median, interquartile range) of times, or (None, 0.0) if there are none"""
+    if not times:
+        return None, 0.0
+    if len(times) < 2:
+        return times[0], 0.0
+    quartiles = statistics.quantiles(times, n=4)
+    return statistics.median(times), quartiles[2] - quartiles[0]
+
+
+def compare(baseline_times: dict, candidate_times: dict, threshold, noise, min_delta_s, min_repeat) -> list:
+    """
+    :return: list of (name, baseline median, candidate median, verdict) in baseline order, then any benchmarks
+    new in the candidate.  The verdict is one of regressed, improved, same, too few repeats, new or missing.
+    """
+    comparisons = []
+    for name in list(baseline_times) + [name for name in candidate_times if name not in baseline_times]:
+        if name not in candidate_times:
+            comparisons.append((name, median_iqr(baseline_times[name])[0], None, "missing"))
+            continue
+        if name not in baseline_times:
+            comparisons.append((name, None, median_iqr(candidate_times[name])[0], "new"))
+            continue
+        base_median, base_iqr = median_iqr(baseline_times[name])
+        cand_median, cand_iqr = median_iqr(candidate_times[name])
+        if base_median is None or cand_median is None:
+            comparisons.append((name, base_median, cand_median, "too few repeats"))
+            continue
+        delta = cand_median - base_median
+        significant = (abs(delta) > threshold * base_median and abs(delta) > noise * max(base_iqr, cand_iqr)
+                       and abs(delta) > min_delta_s)
+        if not significant:
+            verdict = "same"
+        elif min(len(baseline_times[name]), len(candidate_times[name])) < min_repeat:
+            verdict = "too few repeats"
+        else:
+            verdict = "regressed" if delta > 0 else "improved"
+        comparisons.append((name, base_median, cand_median, verdict))
+    return comparisons
+
+
+def format_ms(seconds):
+    return "-" if seconds is None else f"{seconds * 1000:.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("baseline")
+    parser.add_argument("candidate")
+    parser.add_argument("--threshold", type=float, default=0.10, help="fraction of the baseline median")
+    parser.add_argument("--noise", type=float, default=1.5, help="multiple of the larger IQR")
+    parser.add_argument("--min-delta-ms", type=float, default=0.5)
+    parser.add_argument("--min-repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    comparisons = compare(load_times(args.baseline), load_times(args.candidate), args.threshold, args.noise,
+                          args.min_delta_ms / 1000, args.min_repeat)
+    print(f"{'benchmark':36} {'baseline ms':>12} {'candidate ms':>12} {'change':>8}  verdict")
+    for name, base_median, cand_median, verdict in comparisons:
+        change = f"{(cand_median - base_median) / base_median:+.1%}" if base_median and cand_median else "-"
+        print(f"{name:36} {format_ms(base_median):>12} {format_ms(cand_median):>12} {change:>8}  {verdict}")
+    regressed = [name for name, _, _, verdict in comparisons if verdict == "regressed"]
+    if regressed:
+        print(f"regressed: {', '.join(regressed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+#!/usr/local/bin/python3
+"""
+Generates a synthetic journal tree for benchmarking tlog at scale:
+    <root>/journal                           JOURNAL_PATH, a git repo with everything committed
+        Endeavors/endeavors.txt              the generated endeavors, 3 stories each in the sprint
+        Endeavors/goalNN/story NNN story.md  tasks with detail lines and storySource:, titleHash: attributes
+        Endeavors/goalNN/prioritized.md      every other story, in reverse order
+        YYYY/MM/blotter-YYYY-MM-DD.md        the last blotter of each month, yesterday's for this month
+        YYYY/MM/resolved/resolved-*.md       a resolved file for each of the days before
+    <root>/tmp                               TLOG_TMP
+
+Stories get full storySource: paths, as tlog writes them by default.  With --relative-story-source they get
+relative ones instead (apCfg.relative_story_source), and anything that runs tlog on the tree must set
+TLOG_RELATIVE_STORY_SOURCE=1 as well.
+
+Run from the repository root with the tlog modules on the path, as the unit tests are:
+    PYTHONPATH=tlog python benchmarks/journalgen.py [--relative-story-source] <root> [endeavors] [stories] [tasks]
+        [months]
+"""
+import datetime
+import os
+import sys
+
+import fsendeavor
+import journaldir
+from tlconst import apCfg
+
+TASK_LEADERS = ["d - "] * 8 + ["/ - ", "s - "]  # mostly to do, some in progress and scheduled
+
+
+def story_text(endeavor_n, story_n, num_tasks):
+    """A story with num_tasks tasks, each with a couple of detail lines"""
+    lines = ["maxTasks: 3"]
+    for task_n in range(num_tasks):
+        lines += [f"{TASK_LEADERS[task_n % len(TASK_LEADERS)]}task {task_n} of story {story_n} in goal {endeavor_n}",
+                  f" - detail about task {task_n}",
+                  "   some free text notes that go along with the task"]
+    return "\n".join(lines) + "\n"
+
+
+def write_endeavors(endeavor_path, num_endeavors, num_stories, num_tasks):
+    """:return: the enriched story docs, in endeavor and story order"""
+    os.makedirs(os.path.join(endeavor_path, apCfg.default_endeavor_name), exist_ok=True)
+    endeavor_names = [f"goal{endeavor_n:02d}" for endeavor_n in range(num_endeavors)]
+    journaldir.write_filepath("".join(f"{name} 3\n" for name in endeavor_names),
+                              os.path.join(endeavor_path, "endeavors.txt"))
+    story_docs = []
+    for endeavor_n, endeavor_name in enumerate(endeavor_names):
+        endeavor_dir = os.path.join(endeavor_path, endeavor_name)
+        story_names = [f"story {story_n:03d} story.md" for story_n in range(num_stories)]
+        for story_n, story_name in enumerate(story_names):
+            story_file = os.path.join(endeavor_dir, story_name)
+            story_doc, _, _ = fsendeavor.enrich_story_text(story_file, story_text(endeavor_n, story_n, num_tasks),
+                                                           endeavor_path)
+            story_docs.append(story_doc)
+        journaldir.write_filepath("\n".join(reversed(story_names[::2])) + "\n",
+                                  os.path.join(endeavor_dir, "prioritized.md"))
+    return story_docs
+
+
+def blotter_text(daily_o, story_docs, num_tasks=12):
+    """
+    A blotter from tlog's sprint: tasks from the first stories, some of them since completed, abandoned or
+    put in progress, as they are when the next run reads the blotter.
+    """
+    sprint_items = []
+    for story_doc in story_docs:
+        sprint_items += [item for section in story_doc.journal for item in section.body_items
+                         if str(item).startswith("d - ")][:2]
+        if len(sprint_items) >= num_tasks:
+            break
+    leaders = ["x - ", "/ - ", "a - ", "d - "]
+    lines = [f"# To Do {daily_o.domth}"]
+    for item_n, item in enumerate(sprint_items[:num_tasks]):
+        lines.append(leaders[item_n % len(leaders)] + str(item)[len("d - "):])
+    lines += ["", f"# Scheduled {daily_o.domth}", "s - a scheduled task from the blotter", ""]
+    return "\n".join(lines)
+
+
+def resolved_text(daily_o, day_n):
+    return (f"# Resolved {daily_o.domth}\n" + "".join(f"x - resolved task {task_n} of day {day_n}\n"
+                                                        for task_n in range(5)))
+
+
+def write_months(journal_root, story_docs, num_months, today, resolved_per_month=20):
+    """
+    Write yesterday's blotter, and the last blotter of each of the num_months months before, each with resolved
+    files for the days before it in its month.
+    """
+    blotter_days = [today - datetime.timedelta(days=1)]
+    for _ in range(num_months):
+        blotter_days.append(blotter_days[-1].replace(day=1) - datetime.timedelta(days=1))
+    for blotter_day in blotter_days:
+        blotter_daily = journaldir.Daily(journal_root, blotter_day)
+        journaldir.write_filepath(blotter_text(blotter_daily, story_docs),
+                                  os.path.join(blotter_daily.j_month_dir, blotter_daily.cday_blotter_fname))
+        for day_n in range(1, min(resolved_per_month + 1, blotter_day.day)):
+            resolved_daily = journaldir.Daily(journal_root, blotter_day.replace(day=day_n))
+            journaldir.write_filepath(resolved_text(resolved_daily, day_n),
+                                      os.path.join(resolved_daily.jrdir, resolved_daily.cday_resolved_fname))
+
+
+def generate_journal(root, num_endeavors=5, num_stories=20, num_tasks=15, num_months=24, today=None,
+                     relative_story_source=False) -> dict:
+    """
+    Write a synthetic journal tree under root, see the module doc string.
+    :param relative_story_source: write storySource: values as an_endeavor/story.md.  apCfg is only changed
+        while the stories are written.
+    :return: the parameters and paths of the tree, for the benchmark results
+    """
+    today = today or datetime.datetime.now()
+    journal_root = os.path.join(root, "journal")
+    tmp_root = os.path.join(root, "tmp")
+    endeavor_path = journal_root + apCfg.endeavor_path_stub
+    os.makedirs(tmp_root, exist_ok=True)
+    saved_relative_story_source = apCfg.relative_story_source
+    apCfg.relative_story_source = relative_story_source
+    try:
+        story_docs = write_endeavors(endeavor_path, num_endeavors, num_stories, num_tasks)
+    finally:
+        apCfg.relative_story_source = saved_relative_story_source
+    write_months(journal_root, story_docs, num_months, today)
+    journal_repo = journaldir.make_git_repo(journal_root)
+    journal_repo.git.add('--all')
+    journal_repo.index.commit("synthetic journal")
+    journaldir.written_paths.take()
+    return {"endeavors": num_endeavors, "stories": num_stories, "tasks": num_tasks, "months": num_months,
+            "relative_story_source": relative_story_source,
+            "journal_root": journal_root, "tmp_root": tmp_root, "endeavor_path": endeavor_path}
+
+
+def main():
+    args = sys.argv[1:]
+    relative_story_source = "--relative-story-source" in args
+    args = [arg for arg in args if arg != "--relative-story-source"]
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    sizes = [int(arg) for arg in args[1:5]]
+    print(generate_journal(args[0], *sizes, relative_story_source=relative_story_source))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+import os
+import unittest
+
+import journaldir
+import tl_testdata
+from doccache import StoryDocCache
+from tl_testdata import doc1_text
+from tldocument import BlotterDocument
+
+
+class TestEncodable(unittest.TestCase):
+
+    def testDocumentEncodableRoundTrip(self):
+        """A BlotterDocument rebuilt from as_encodable() has the same text as the original"""
+        doc = BlotterDocument.fromtext(doc1_text)
+        self.assertEqual(doc1_text, str(BlotterDocument.obj_from_encodable(doc.as_encodable())))
+
+    def testDocumentEncodableKeepsAttribs(self):
+        doc = BlotterDocument.fromtext(doc1_text)
+        rebuilt = BlotterDocument.obj_from_encodable(doc.as_encodable())
+        self.assertEqual(doc.get_doc_attrib(tl_testdata.ad1), rebuilt.get_doc_attrib(tl_testdata.ad1))
+
+
+class TestStoryDocCache(unittest.TestCase):
+
+    def setUp(self):
+        upo = tl_testdata.getUnitTestUserPathObject()
+        self.story_dir = journaldir.path_join(upo.endeavor_path, "cacheGoal")
+        self.cache_file = journaldir.path_join(upo.tmp_root, "test_story_doc_cache.json")
+        journaldir.remove_filepath(self.cache_file)
+
+    def write_story(self, name, text):
+        story_file = journaldir.path_join(self.story_dir, name)
+        journaldir.write_filepath(text, story_file)
+        return story_file
+
+    def testHitAfterSave(self):
+        story_file = self.write_story("cached story.md", doc1_text)
+        cache = StoryDocCache(self.cache_file)
+        cache.put(story_file, doc1_text, BlotterDocument.fromtext(doc1_text))
+        cache.save()
+        reloaded_cache = StoryDocCache(self.cache_file)
+        cached_doc = reloaded_cache.get(story_file, journaldir.read_file_str(story_file))
+        self.assertEqual(doc1_text, str(cached_doc))
+        self.assertEqual(1, reloaded_cache.hits)
+
+    def testHitWithListedStat(self):
+        """the stat from a StoryDir listing can stand in for statting the story file"""
+        story_file = self.write_story("listed story.md", doc1_text)
+        cache = StoryDocCache(self.cache_file)
+        cache.put(story_file, doc1_text, BlotterDocument.fromtext(doc1_text))
+        file_stat = journaldir.StoryDir(self.story_dir).get_file_stat(story_file)
+        self.assertEqual(doc1_text, str(cache.get(story_file, doc1_text, file_stat)))
+        self.assertIsNone(cache.get(story_file, doc1_text, os.stat(self.story_dir)))  # another file's stat
+
+    def testMissWhenFileChanged(self):
+        story_file = self.write_story("changed story.md", doc1_text)
+        cache = StoryDocCache(self.cache_file)
+        cache.put(story_file, doc1_text, BlotterDocument.fromtext(doc1_text))
+        changed_text = doc1_text + "\nd - a new task"
+        journaldir.write_filepath(changed_text, story_file)
+        self.assertIsNone(cache.get(story_file, changed_text))
+        self.assertEqual(1, cache.misses)
+
+    def testEvictMissingAndOverLimit(self):
+        gone_file = self.write_story("gone story.md", doc1_text)
+        kept_files = [self.write_story(f"kept {n} story.md", doc1_text) for n in range(3)]
+        cache = StoryDocCache(self.cache_file, max_entries=2)
+        for story_file in [gone_file] + kept_files:
+            cache.put(story_file, doc1_text, BlotterDocument.fromtext(doc1_text))
+        os.remove(gone_file)
+        cache.save()
+        self.assertEqual(kept_files[1:], list(StoryDocCache(self.cache_file).entries.keys()))
+
+
+if __name__ == '__main__':
+    unittest.main()
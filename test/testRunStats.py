@@ -0,0 +1,52 @@
+import json
+import os
+import unittest
+
+import journaldir
+import tl_testdata
+import tldocument
+from docsec import LineKind, tokenize_lines
+from runstats import RunStats, run_stats
+from tl_testdata import doc1_text
+from tldocument import BlotterDocument
+
+
+class TestRunStats(unittest.TestCase):
+
+    def testPhasesInOrder(self):
+        stats = RunStats()
+        stats.phase("load")
+        stats.phase("write")
+        stats.count("files_written", 2)
+        stats.count("files_written")
+        record = stats.as_encodable()
+        self.assertEqual(["load", "write"], [phase["name"] for phase in record["phases"]])
+        self.assertEqual({"files_written": 3}, record["counters"])
+        self.assertGreaterEqual(record["wall_s"], 0)
+
+    def testAppendOneLinePerRun(self):
+        upo = tl_testdata.getUnitTestUserPathObject()
+        stats_file = journaldir.path_join(upo.tmp_root, "test_run_stats.jsonl")
+        journaldir.remove_filepath(stats_file)
+        for run in range(2):
+            stats = RunStats()
+            stats.phase(f"run {run}")
+            stats.append_to(stats_file)
+        with open(stats_file) as stats_fd:
+            records = [json.loads(line) for line in stats_fd]
+        self.assertEqual(["run 0", "run 1"], [record["phases"][0]["name"] for record in records])
+
+    def testParsingAndWritingCounted(self):
+        items_before = run_stats.counters.get("items_parsed", 0)
+        written_before = run_stats.counters.get("files_written", 0)
+        doc = BlotterDocument.fromtext(doc1_text)
+        upo = tl_testdata.getUnitTestUserPathObject()
+        journaldir.write_filepath(doc, os.path.join(upo.tmp_root, "test_run_stats_doc.md"))
+        task_count = sum(token.kind == LineKind.TASK
+                         for token in tokenize_lines(doc1_text.split("\n"), tldocument.top_parser_pat))
+        self.assertEqual(items_before + task_count, run_stats.counters["items_parsed"])
+        self.assertEqual(written_before + 1, run_stats.counters["files_written"])
+
+
+if __name__ == '__main__':
+    unittest.main()
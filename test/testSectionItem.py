@@ -1,16 +1,20 @@
 #!/usr/local/bin/python3
+import json
 import os
+import re
 import unittest
 
 import tl_testdata
 import unit_test_tmp_dir
 
+import fsendeavor
 import journaldir
 import tlog
+from tlconst import apCfg
 
 #.tlog import write_back_updated_story
 
-from docsec import Section, TLogInternalException, ItemAttribute, Item
+from docsec import Section, TLogInternalException, ItemAttribute, Item, LineKind, tokenize_line
 from tl_testdata import dtask_line, dtask_item_text, \
     as1, vs1, as2, vs2, ai1, vi1, item_attrib_line1, ai2, vi2, item_attrib_line2, item_2attr_str, \
     dtask_item_text_w_saved_hash, dtask_item_text_w_saved_hash_modified_title, sec_two_items, sec_attrib_wrong, \
@@ -72,6 +76,15 @@ free text\
         itest1 = itest.deep_copy(tldocument.top_parser_pat)
         self.assertEqual(str(itest), str(itest1))
 
+    def testItemDeepCopyIndependentContainers(self):
+        "Does changing the copy's subs and attributes leave the original unchanged?"
+        itest = Item.fromtext(tldocument.top_parser_pat, dtask_item_text)
+        itest1 = itest.deep_copy()
+        itest1.subs.append(" - another sub")
+        itest1.set_attrib(ai1, "changed")
+        itest1.top = "x - done"
+        self.assertEqual(dtask_item_text, str(itest))
+
     def testGetStatus(self):
         """
         get_leader base case with leader and title
@@ -213,6 +226,21 @@ free text\
         # print(f"post_condition: {post_condition}")
         self.assertEqual(pre_condition, post_condition)
 
+    def testParsedTopFollowsTopChanges(self):
+        """leader, title, status and title hash parsed from top are refreshed when top changes"""
+        itest: Item = Item(tldocument.top_parser_pat, "/ - doing it")
+        self.assertEqual(("/ -", "doing it", tldocument.statuses.in_progress),
+                         (itest.get_leader(), itest.get_title(), itest.get_status()))
+        first_hash = itest.get_title_hash()
+        itest.modify_item_top(tldocument.statuses.in_progress.pattern, tldocument.unfinished_s)
+        self.assertEqual(("u -", tldocument.statuses.unfinished), (itest.get_leader(), itest.get_status()))
+        itest.merge_parts(Item(tldocument.top_parser_pat, "d - doing something else"))
+        self.assertEqual("doing something else", itest.get_title())
+        self.assertNotEqual(first_hash, itest.get_title_hash())
+        itest.top = "free text"
+        self.assertEqual((None, None, None, ''),
+                         (itest.get_leader(), itest.get_title(), itest.get_status(), itest.get_title_hash()))
+
     def testItemNoSub(self):
         out = "d - item with no sub lines!"
         itest: Item = Item(tldocument.top_parser_pat, out)
@@ -281,6 +309,16 @@ free text\
         # print(itest.attribs_str())
         self.assertEqual(item_2attr_str, itest.attribs_str())
 
+    def testAttribsStrAfterSetAttrib(self):
+        "Does attribs_str show an attribute set after the attributes were rendered, and only on that Item?"
+        itest: Item = Item(tldocument.top_parser_pat, item_attrib_line2)
+        itest_copy = itest.deep_copy(tldocument.top_parser_pat)
+        self.assertEqual(item_attrib_line2, itest.attribs_str())
+        self.assertIs(itest.attribs_str(), itest.attribs_str())
+        itest.set_attrib(ai1, vi1)
+        self.assertEqual(item_2attr_str, itest.attribs_str())
+        self.assertEqual(item_attrib_line2, itest_copy.attribs_str())
+
 
 class testSection(unittest.TestCase):
 
@@ -389,6 +427,14 @@ AnAttributeName: the Attribute Value\
         stest = Section.fromtext(tldocument.top_parser_pat, sec_w_attrib)
         self.assertIs(stest.get_section_attrib("wrongKey"), None)
 
+    def testSectionDeepCopy(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, sec_two_items)
+        scopy = stest.deep_copy()
+        self.assertEqual(sec_two_items, str(scopy))
+        self.assertIsNot(stest.body_items[0], scopy.body_items[0])
+        scopy.add_item(Item(tldocument.top_parser_pat, "d - only in the copy"))
+        self.assertEqual(sec_two_items, str(stest))
+
     def testSectionWith2Items(self):
         stest = Section.fromtext(tldocument.top_parser_pat, sec_two_items)
         self.assertEqual(sec_two_items, str(stest))
@@ -435,6 +481,88 @@ AnAttributeName: the Attribute Value\
     #def test_add_all_missing_item_titleHash(self):
 
 
+class TestSectionItemIndex(unittest.TestCase):
+
+    sec_text = "# head\nd - first task\nx - second task\nd - third task"
+
+    def testFindItemByTitle(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        found = stest.find_item(Item(tldocument.top_parser_pat, "\\ - second task"))
+        self.assertIs(stest.body_items[1], found)
+        self.assertIsNone(stest.find_item(Item(tldocument.top_parser_pat, "d - no such task")))
+
+    def testFindItemBySavedHashAfterTitleChange(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        incoming = Item(tldocument.top_parser_pat, "d - third task")
+        incoming.save_title_hash()
+        stest.find_item(incoming)  # builds the index before the body item changes
+        third = stest.body_items[2]
+        third.save_title_hash()
+        third.top = "d - third task, retitled"
+        self.assertIs(third, stest.find_item(incoming))
+        self.assertIsNone(stest.find_item(Item(tldocument.top_parser_pat, "d - third task, retitled")))
+
+    def testFindItemFirstInBodyOrder(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        stest.find_item(Item(tldocument.top_parser_pat, "d - first task"))
+        stest.add_item(Item(tldocument.top_parser_pat, "x - first task"), head_insert=True)
+        self.assertEqual("x - first task", stest.find_item(Item(tldocument.top_parser_pat, "d - first task")).top)
+
+    def testItemPositionsInBodyOrder(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        stest.find_item(Item(tldocument.top_parser_pat, "d - first task"))  # builds the index
+        stest.add_item(Item(tldocument.top_parser_pat, "x - third task"), head_insert=True)
+        stest.add_item(Item(tldocument.top_parser_pat, "d - third task"))
+        stest.remove_item(Item(tldocument.top_parser_pat, "d - second task"))
+        stest.set_sec_attrib("anAttribute", "a value")
+        positions = [stest.item_position(item) for item in stest.body_items]
+        self.assertEqual(sorted(positions), positions)
+        self.assertEqual(len(set(positions)), len(positions))
+        self.assertIs(stest.body_items[1], stest.find_item(Item(tldocument.top_parser_pat, "d - third task")))
+
+    def testMergeAndRemoveKeepIndex(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        stest.add_item_merge_enhanced(Item(tldocument.top_parser_pat, "x - first task"))
+        self.assertEqual(3, len(stest.body_items))
+        self.assertEqual("x - first task", stest.body_items[0].top)
+        stest.remove_item(Item(tldocument.top_parser_pat, "d - first task"))
+        self.assertIsNone(stest.find_item(Item(tldocument.top_parser_pat, "d - first task")))
+        stest.add_item(Item(tldocument.top_parser_pat, "d - fourth task"))
+        self.assertIs(stest.body_items[-1], stest.find_item(Item(tldocument.top_parser_pat, "d - fourth task")))
+
+    def testMatchingItemByTitleHashAttribute(self):
+        stest = Section.fromtext(tldocument.top_parser_pat, TestSectionItemIndex.sec_text)
+        stest.add_all_missing_item_title_hash()
+        second = stest.body_items[1]
+        attrib = stest.get_matching_item_by_attribute(Item.title_hash_attr_str, second.get_title_hash())
+        self.assertIs(second.get_item_attrib_holder(Item.title_hash_attr_str), attrib)
+
+
+class TestTokenizeLine(unittest.TestCase):
+
+    def testTokenKinds(self):
+        for line, kind in [(sec_head, LineKind.HEADING), (dtask_line, LineKind.TASK),
+                           (item_attrib_line1, LineKind.ATTRIBUTE), ("", LineKind.BLANK), ("  ", LineKind.BLANK),
+                           (" - sub item", LineKind.TEXT), ("d - ", LineKind.TEXT)]:
+            self.assertEqual(kind, tokenize_line(line, tldocument.top_parser_pat).kind)
+
+    def testTaskToken(self):
+        token = tokenize_line("/ -  in progress ", tldocument.top_parser_pat)
+        self.assertEqual(("/ -", "in progress", tldocument.statuses.in_progress),
+                         (token.leader, token.title, token.status))
+
+    def testTaskTokenWithRegexTopParser(self):
+        """a plain compiled regex works as the top_parser_pat, with no status"""
+        top_parser_re = re.compile(tldocument.leader_group_str + tldocument.title_group_str)
+        token = tokenize_line(dtask_line, top_parser_re)
+        self.assertEqual((LineKind.TASK, "d -", "do task", None),
+                         (token.kind, token.leader, token.title, token.status))
+
+    def testAttributeToken(self):
+        token = tokenize_line(item_attrib_line1, tldocument.top_parser_pat)
+        self.assertEqual((ai1, vi1), (token.attrib.name, token.attrib.value))
+
+
 class testTLAttribute(unittest.TestCase):
     positive_key = "SomeAttribute"
     positive_value = " the value of it"
@@ -470,6 +598,14 @@ class testTLAttribute(unittest.TestCase):
             str(ItemAttribute.fromline(testTLAttribute.valid_line)),
             testTLAttribute.valid_line)
 
+    def testTLAttributeNamesShared(self):
+        "Attributes parsed from different lines share one name string, and have no per instance __dict__"
+        attr1 = ItemAttribute.fromline("".join(["story", "Source:a"]))
+        attr2 = ItemAttribute.fromline("".join(["story", "Source:b"]))
+        self.assertIs(attr1.name, attr2.name)
+        self.assertFalse(hasattr(attr1, "__dict__"))
+        self.assertFalse(hasattr(Item(tldocument.top_parser_pat, "d - x"), "__dict__"))
+
 class TestStoryIO(unittest.TestCase):
     """prove story reading and writing work flows in docs/Tlog User Documentation.md"""
 # load_story_from_file(file_name) should have titleHash and StorySource
@@ -500,6 +636,83 @@ class TestStoryIO(unittest.TestCase):
         reloadStory: BlotterDocument = tlog.load_doc_from_file(fileIOPath)
         self.assertEqual(new_item_section_heading + str(storyItem), str(reloadStory))
 
+    def test_write_items_to_story_files(self):
+        """items for the same storySource are merged into one load and write of the story file"""
+        fileIOPath = journaldir.path_join(TestStoryIO.userPathObject.endeavor_path, "testGoal")
+        defaultPath = journaldir.path_join(fileIOPath, "testDefaultStory.md")
+        fileIOPath = journaldir.path_join(fileIOPath, "testBatchedStory.md")
+        journaldir.remove_filepath(fileIOPath)
+        journaldir.remove_filepath(defaultPath)
+        first_item = Item.fromtext(tldocument.top_parser_pat, dtask_line)
+        first_item.set_attrib("storySource", fileIOPath)
+        second_item = Item.fromtext(tldocument.top_parser_pat, "d - do another task")
+        second_item.set_attrib("storySource", fileIOPath)
+        default_item = Item.fromtext(tldocument.top_parser_pat, "s - a scheduled task")
+        story_docs = tlog.write_items_to_story_files([first_item, default_item, second_item], defaultPath)
+        self.assertEqual([fileIOPath, defaultPath], list(story_docs.keys()))
+        self.assertEqual(defaultPath, default_item.get_item_attrib("storySource"))
+        reloadStory: BlotterDocument = tlog.load_doc_from_file(fileIOPath)
+        self.assertEqual(str(story_docs[fileIOPath]), str(reloadStory))
+        self.assertEqual(2, len(reloadStory.get_document_matching_list(tldocument.unresolved_pat)))
+
+    def test_remove_items_from_story_files(self):
+        """resolved items for the same storySource are all removed with one load and write of the story file"""
+        fileIOPath = journaldir.path_join(TestStoryIO.userPathObject.endeavor_path, "testGoal")
+        fileIOPath = journaldir.path_join(fileIOPath, "testBulkRemoveStory.md")
+        journaldir.write_filepath("\n".join(["d - keep this task", "d - first done", "d - second done"]), fileIOPath)
+        resolved_items = [Item.fromtext(tldocument.top_parser_pat, "x - first done"),
+                          Item.fromtext(tldocument.top_parser_pat, "x - second done"),
+                          Item.fromtext(tldocument.top_parser_pat, "x - has no storySource")]
+        for resolved_item in resolved_items[0:2]:
+            resolved_item.set_attrib("storySource", fileIOPath)
+        story_docs = tlog.remove_items_from_story_files(resolved_items)
+        self.assertEqual([fileIOPath], list(story_docs.keys()))
+        self.assertEqual("d - keep this task", journaldir.read_file_str(fileIOPath))
+
+    def test_relative_story_source(self):
+        """a relative storySource is written as an_endeavor/story.md, and resolved back to the story file"""
+        endeavor_path = TestStoryIO.userPathObject.endeavor_path
+        fileIOPath = journaldir.path_join(journaldir.path_join(endeavor_path, "testGoal"), "testRelativeStory.md")
+        journaldir.write_filepath("\n".join(["d - keep this task", "d - relative done"]), fileIOPath)
+        story_source = fsendeavor.encode_story_source(fileIOPath, relative=True, endeavor_path=endeavor_path)
+        self.assertEqual(os.path.join("testGoal", "testRelativeStory.md"), story_source)
+        self.assertEqual(fileIOPath, fsendeavor.encode_story_source(fileIOPath, relative=False))
+        self.assertEqual(fileIOPath, fsendeavor.resolve_story_source(fileIOPath, endeavor_path))
+        resolved_item = Item.fromtext(tldocument.top_parser_pat, "x - relative done")
+        resolved_item.set_attrib("storySource", story_source)
+        story_docs = tlog.remove_items_from_story_files([resolved_item], endeavor_path)
+        self.assertEqual([os.path.join(endeavor_path, story_source)], list(story_docs.keys()))
+        self.assertEqual("d - keep this task", journaldir.read_file_str(fileIOPath))
+
+    def test_relative_story_source_outside_endeavor_path(self):
+        """a story file that is not in an endeavor of endeavor_path keeps its full path as its storySource"""
+        endeavor_path = TestStoryIO.userPathObject.endeavor_path
+        default_file = journaldir.path_join(TestStoryIO.userPathObject.tmp_root, "outsideEndeavors story.md")
+        journaldir.write_filepath("d - already here", default_file)
+        self.assertEqual(default_file, fsendeavor.encode_story_source(default_file, True, endeavor_path))
+        saved_relative = apCfg.relative_story_source
+        apCfg.relative_story_source = True
+        try:
+            new_item = Item.fromtext(tldocument.top_parser_pat, "d - new task without a storySource")
+            story_doc = tlog.write_item_to_story_file(new_item, default_file, endeavor_path=endeavor_path)
+        finally:
+            apCfg.relative_story_source = saved_relative
+        self.assertEqual(default_file, new_item.get_item_attrib("storySource"))
+        self.assertEqual(str(story_doc), journaldir.read_file_str(default_file))
+        self.assertIn("d - new task without a storySource", str(story_doc))
+
+    def test_attribute_values_shared(self):
+        """the storySource value parsed for each item of a story is one shared string"""
+        story_doc = BlotterDocument.fromtext("\n".join(["d - one", "storySource:/a/goal/story.md",
+                                                        "d - two", "storySource:/a/goal/story.md"]))
+        first, second = story_doc.get_document_matching_list(tldocument.unresolved_pat)
+        self.assertIs(first.get_item_attrib("storySource"), second.get_item_attrib("storySource"))
+        # as rebuilt from the story doc cache or sent back from a parse worker process
+        encoded_doc = json.loads(json.dumps(story_doc.as_encodable()))
+        first, second = BlotterDocument.obj_from_encodable(encoded_doc).get_document_matching_list(
+            tldocument.unresolved_pat)
+        self.assertIs(first.get_item_attrib("storySource"), second.get_item_attrib("storySource"))
+
 
 
 
@@ -1,4 +1,5 @@
 #!/usr/local/bin/python3
+import io
 import re
 import unittest
 from tldocument import BlotterDocument
@@ -192,6 +193,105 @@ d - put way misc paper tax files
 		task_list = small_story_doc.get_limited_tasks_from_unresolved_list()
 		self.assertEqual(int(mt), len(task_list))
 
+class TestStatusClassifier(unittest.TestCase):
+	"""Tests for the first character dispatch of task leaders in tldocument.top_parser_pat"""
+
+	def testClassifyTaskLine(self):
+		status, leader, title = tldocument.classify_task_line("x - did something ")
+		self.assertEqual((tldocument.statuses.completed, "x -", "did something"), (status, leader, title))
+
+	def testClassifyEveryStatus(self):
+		for line, status_name in [("a - a", 'abandoned'), ("X- x", 'completed'), ("s - s", 'scheduled'),
+								  ("/ - p", 'in_progress'), ("\\ - p", 'in_progress'), ("U - u", 'unfinished'),
+								  ("d  - d", 'do')]:
+			self.assertEqual(status_name, tldocument.classify_task_line(line)[0].name)
+
+	def testClassifyNotTaskLine(self):
+		for line in ["", "free text", " - sub item", "titleHash:123", "# heading", "d - ", "do it"]:
+			self.assertIsNone(tldocument.classify_task_line(line))
+
+	def testMatchEquivalentToAlternation(self):
+		"""top_parser_pat matches the same lines, with the same groups, as the alternation regex it replaces"""
+		alternation_pat = re.compile(tldocument.leader_group_str + tldocument.title_group_str)
+		for line in ["x - did it", "a-dropped", "\\ - doing", "d - ", "D -  do it  ", "q - not a task", " d - sub"]:
+			expected = alternation_pat.match(line)
+			actual = tldocument.top_parser_pat.match(line)
+			self.assertEqual(expected.groups() if expected else None, actual.groups() if actual else None)
+
+	def testFindStatusName(self):
+		self.assertEqual('unfinished', tldocument.find_status_name("u -"))
+		self.assertIsNone(tldocument.find_status_name("q -"))
+
+	def testScrumInsertByLeader(self):
+		doc = BlotterDocument(day="Sun 1st")
+		section = doc.scrum.insert_item(Item(tldocument.top_parser_pat, "s - later"))
+		self.assertIs(doc.scrum.head_instance_dict[doc.scheduled_section_head], section)
+
+
+class TestDocumentItemIndex(unittest.TestCase):
+	"""Tests that the document item index finds what a scan of every journal Section would"""
+
+	story_text = "# First\nd - shared task\nd - only first\n# Second\nd - shared task\nx - only second"
+
+	def testInsertUpdateMergesFirstMatch(self):
+		doc = BlotterDocument.fromtext(TestDocumentItemIndex.story_text)
+		doc.insert_update_document_item(Item(tldocument.top_parser_pat, "x - shared task"))  # journal[0] is empty
+		self.assertEqual("x - shared task", doc.journal[1].body_items[0].top)
+		self.assertEqual("d - shared task", doc.journal[2].body_items[0].top)
+
+	def testInsertUpdateAddsNewItemUnderHeading(self):
+		doc = BlotterDocument.fromtext(TestDocumentItemIndex.story_text)
+		doc.insert_update_document_item(Item(tldocument.top_parser_pat, "d - new task"), "# Second")
+		self.assertEqual("d - new task", doc.journal[2].body_items[0].top)
+		doc.insert_update_document_item(Item(tldocument.top_parser_pat, "d - newer task"), "# Third")
+		self.assertEqual(["# Third"], [section.header for section in doc.get_sections_by_header("# Third")])
+		self.assertEqual(doc.journal[-1], doc.find_document_items(Item(tldocument.top_parser_pat, "d - newer task"))[0][0])
+
+	def testRemoveFromEverySection(self):
+		doc = BlotterDocument.fromtext(TestDocumentItemIndex.story_text)
+		doc.remove_document_item(Item(tldocument.top_parser_pat, "d - shared task"))
+		self.assertEqual("# First\nd - only first\n# Second\nx - only second", str(doc))
+		self.assertEqual([], doc.find_document_items(Item(tldocument.top_parser_pat, "d - shared task")))
+
+	def testIndexFollowsSavedHash(self):
+		doc = BlotterDocument.fromtext(TestDocumentItemIndex.story_text)
+		doc.build_item_index()
+		doc.for_journal_sections_add_all_missing_item_title_hash()
+		only_second = doc.journal[2].body_items[1]
+		incoming = Item(tldocument.top_parser_pat, "d - only second, retitled")
+		incoming.set_attrib(Item.title_hash_attr_str, only_second.get_title_hash())
+		self.assertEqual([(doc.journal[2], only_second)], doc.find_document_items(incoming))
+
+	def testFindInJournalOrderAfterHeadInsert(self):
+		doc = BlotterDocument.fromtext(TestDocumentItemIndex.story_text)
+		doc.build_item_index()
+		doc.insert_update_document_item(Item(tldocument.top_parser_pat, "d - new task"), "# Third")
+		doc.journal[-1].add_item(Item(tldocument.top_parser_pat, "x - shared task"), head_insert=True)
+		doc.journal[0].body_items[0].top = "d - not empty"
+		doc.story_name = "a story"  # inserts a Section ahead of the rest
+		located = doc.find_document_items(Item(tldocument.top_parser_pat, "d - shared task"))
+		self.assertEqual([doc.journal[2], doc.journal[3], doc.journal[4]], [section for section, item in located])
+		self.assertEqual("x - shared task", located[-1][1].top)
+
+
+class TestWriteTo(unittest.TestCase):
+	"""write_to() streams the same text that str() returns"""
+
+	def testDocumentWriteTo(self):
+		for text in [doc1_text, TestDocument.small_story, "# empty\n\n# h\nd - a\n\n", "k:v\n\nd - a\n - sub"]:
+			doc = BlotterDocument.fromtext(text)
+			fp = io.StringIO()
+			doc.write_to(fp)
+			self.assertEqual(str(doc), fp.getvalue())
+
+	def testScrumWriteTo(self):
+		doc = BlotterDocument.fromtext(doc1_text)
+		doc.add_section_list_items_to_scrum(doc.journal)
+		fp = io.StringIO()
+		doc.scrum.write_to(fp)
+		self.assertEqual(str(doc.scrum), fp.getvalue())
+
+
 class special_sections:
 	"holds some test data for DocumentStructure"
 	def __init__(self):
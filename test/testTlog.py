@@ -1,8 +1,16 @@
+import concurrent.futures
+import os
+import threading
 import unittest
+import unittest.mock
 
-from fsendeavor import FileSystemEndeavor
+import fsendeavor
+from doccache import StoryDocCache
+from fsendeavor import FileSystemEndeavor, FileSystemDomain
+from tlconst import apCfg
 from tldocument import BlotterDocument
 import journaldir
+import tlog
 # from tlog import StoryGroup
 
 
@@ -45,3 +53,93 @@ class TestTlog(unittest.TestCase):
 		# print("first_story", first_story)
 		self.assertEqual(expected_story_text, str(first_story))
 
+	def testUnchangedStoriesNotRewritten(self):
+		"""a second load of the same stories finds nothing to enrich, so no story file is written"""
+		max_stories: int = 6
+		FileSystemEndeavor(max_stories, journaldir.StoryDir(test_storydir_str))
+		fsendeavor.story_write_counts.reset()
+		story_group = FileSystemEndeavor(max_stories, journaldir.StoryDir(test_storydir_str))
+		self.assertEqual(0, fsendeavor.story_write_counts.written)
+		self.assertEqual(len(story_group.story_docs), fsendeavor.story_write_counts.skipped)
+
+	def testCachedStoriesMatchParsedStories(self):
+		"""stories rehydrated from the StoryDocCache have the same text as stories parsed from the files"""
+		max_stories: int = 6
+		cache_file = journaldir.path_join(upo.tmp_root, "testTlog_story_doc_cache.json")
+		journaldir.remove_filepath(cache_file)
+		first_cache = StoryDocCache(cache_file)
+		parsed_group = FileSystemEndeavor(max_stories, journaldir.StoryDir(test_storydir_str), first_cache)
+		first_cache.save()
+		doc_cache = StoryDocCache(cache_file)
+		cached_group = FileSystemEndeavor(max_stories, journaldir.StoryDir(test_storydir_str), doc_cache)
+		self.assertEqual(str(parsed_group), str(cached_group))
+		self.assertEqual(len(cached_group.story_docs), doc_cache.hits)
+
+	def testCachedStoriesEnrichedAgainAfterSettingChange(self):
+		"""a story cached with absolute storySource values gets relative ones once relative_story_source is set"""
+		story_dir = journaldir.path_join(upo.endeavor_path, "settingsGoal")
+		story_file = journaldir.path_join(story_dir, "settings story.md")
+		journaldir.write_filepath("d - first task\nd - second task\n", story_file)
+		cache_file = journaldir.path_join(upo.tmp_root, "testTlog_settings_cache.json")
+		journaldir.remove_filepath(cache_file)
+		saved_relative = apCfg.relative_story_source
+		try:
+			for relative in (False, True):
+				apCfg.relative_story_source = relative
+				doc_cache = StoryDocCache(cache_file)
+				FileSystemEndeavor(3, journaldir.StoryDir(story_dir), doc_cache, endeavor_path=upo.endeavor_path)
+				doc_cache.save()
+		finally:
+			apCfg.relative_story_source = saved_relative
+		self.assertEqual(0, doc_cache.hits)
+		story_text = journaldir.read_file_str(story_file)
+		self.assertEqual(2, story_text.count("storySource:" + os.path.join("settingsGoal", "settings story.md")))
+		self.assertNotIn(upo.endeavor_path, story_text)
+
+	def testConcurrentDomainLoadKeepsOrder(self):
+		"""a FileSystemDomain loaded on a thread pool has the same endeavors and stories, in order, as a sequential load"""
+		os.makedirs(journaldir.path_join(upo.endeavor_path, "default"), exist_ok=True)
+		journaldir.write_filepath("aGoal 2\n", upo.endeavor_file)
+		sequential_domain = FileSystemDomain(upo, load_workers=1)
+		concurrent_domain = FileSystemDomain(upo, load_workers=4)
+		self.assertEqual([str(sd) for sd in sequential_domain.get_all_story_dirs()],
+						 [str(sd) for sd in concurrent_domain.get_all_story_dirs()])
+		self.assertEqual([str(fse) for fse in sequential_domain.file_system_endeavors],
+						 [str(fse) for fse in concurrent_domain.file_system_endeavors])
+
+	def testProcessPoolDomainLoadMatchesInProcess(self):
+		"""stories parsed in worker processes are rehydrated into the same documents as stories parsed in-process"""
+		os.makedirs(journaldir.path_join(upo.endeavor_path, "default"), exist_ok=True)
+		journaldir.write_filepath("aGoal 2\n", upo.endeavor_file)
+		in_process_domain = FileSystemDomain(upo, load_workers=1, parse_processes=0)
+		journaldir.remove_filepath(upo.story_cache_file)  # force every story through the worker processes
+		process_domain = FileSystemDomain(upo, load_workers=1, parse_processes=2, parse_process_min_chars=0)
+		self.assertEqual(0, process_domain.doc_cache.hits)
+		self.assertEqual([str(fse) for fse in in_process_domain.file_system_endeavors],
+						 [str(fse) for fse in process_domain.file_system_endeavors])
+
+	def testNoLoadThreadsWhenProcessesFork(self):
+		"""the story loading thread pool is shut down before the worker process pool is started"""
+		os.makedirs(journaldir.path_join(upo.endeavor_path, "default"), exist_ok=True)
+		journaldir.write_filepath("aGoal 2\n", upo.endeavor_file)
+		journaldir.remove_filepath(upo.story_cache_file)
+		thread_counts = []
+		real_process_pool = concurrent.futures.ProcessPoolExecutor
+
+		def counting_process_pool(*args, **kwargs):
+			thread_counts.append(threading.active_count())
+			return real_process_pool(*args, **kwargs)
+
+		with unittest.mock.patch("concurrent.futures.ProcessPoolExecutor", counting_process_pool):
+			FileSystemDomain(upo, load_workers=4, parse_processes=2, parse_process_min_chars=0)
+		self.assertEqual([threading.active_count()], thread_counts)
+
+	def testFindPrevJournalDirWithIndex(self):
+		"""the journal index finds the same previous journal dir as the month by month search"""
+		journal_root = os.path.join(upo.tmp_root, "prevJournal")
+		journaldir.write_filepath("d - a task", os.path.join(journal_root, "2020", "11", "blotter-2020-11-02.md"))
+		journal_index = journaldir.JournalIndex(journal_root, os.path.join(upo.tmp_root, "prev_journal_index.json"))
+		for latest_month, history_months in [("02", 24), ("02", 3), ("02", 4), ("01", 0)]:
+			latest_dir = os.path.join(journal_root, "2021", latest_month)
+			self.assertEqual(tlog.find_prev_journal_dir(latest_dir, history_months),
+							 tlog.find_prev_journal_dir(latest_dir, history_months, journal_index))
@@ -1,5 +1,10 @@
 #!/usr/local/bin/python3
+import copy
 import os
+import shutil
+import subprocess
+import sys
+import types
 import unittest
 
 import tlutil
@@ -11,6 +16,7 @@ from unittest import TestCase
 import unit_test_tmp_dir
 import tl_testdata
 import journaldir
+from fsendeavor import FileSystemDomain
 
 if __name__ == '__main__':
     unittest.main()
@@ -95,8 +101,193 @@ class TestStoryDir(TestCase):
         # print("sd", sd)
         self.assertEqual(expected_storydir_str, str(sd))
 
+    def testPrioritizedOrderCachedUntilChanged(self):
+        story_dir = os.path.join(unit_test_tmp_dir.uttd, "priorityCacheGoal")
+        shutil.rmtree(story_dir, ignore_errors=True)
+        for story_name in ["a story.md", "b story.md", "c story.md"]:
+            journaldir.write_filepath("d - a task", os.path.join(story_dir, story_name))
+        pri_file = os.path.join(story_dir, "prioritized.md")
+        journaldir.write_filepath("c story.md\n\nmissing story.md\nb story.md", pri_file)
+        self.assertEqual(["c story.md", "b story.md", "a story.md"],
+                         [os.path.basename(f) for f in journaldir.StoryDir(story_dir).story_list])
+        first_order = journaldir.priority_order_cache.orders[pri_file][2]
+        journaldir.StoryDir(story_dir)
+        self.assertIs(first_order, journaldir.priority_order_cache.orders[pri_file][2])
+        journaldir.write_filepath("a story.md", pri_file)
+        self.assertEqual(["a story.md", "b story.md", "c story.md"],
+                         [os.path.basename(f) for f in journaldir.StoryDir(story_dir).story_list])
+
 #    def test
 
+class TestJournalIndex(TestCase):
+    """the journal index finds the same month dir that searching back month by month does"""
+
+    def setUp(self):
+        self.journal_root = os.path.join(unit_test_tmp_dir.uttd, "indexJournal")
+        self.index_file = os.path.join(upo.tmp_root, "test_journal_index.json")
+        shutil.rmtree(self.journal_root, ignore_errors=True)
+        journaldir.remove_filepath(self.index_file)
+        for month_dir, file_name in [("2021/11", "blotter-2021-11-30.md"), ("2022/02", "notes.txt"),
+                                     ("2022/01", "blotter-2022-01-03.md"), ("2022/01", "blotter-2022-01-04.md")]:
+            journaldir.write_filepath("d - a task", os.path.join(self.journal_root, month_dir, file_name))
+
+    def testFindLatestMonthDir(self):
+        journal_index = journaldir.JournalIndex(self.journal_root, self.index_file)
+        self.assertEqual(["2021/11", "2022/01"], sorted(journal_index.months.keys()))
+        month_dir, story_files, blotter_files = journal_index.find_latest_month_dir(
+            os.path.join(self.journal_root, "2022", "03"), 24)
+        self.assertEqual(os.path.join(self.journal_root, "2022", "01"), month_dir)
+        self.assertEqual(["blotter-2022-01-03.md", "blotter-2022-01-04.md"],
+                         [os.path.basename(f) for f in blotter_files])
+        self.assertIsNone(journal_index.find_latest_month_dir(os.path.join(self.journal_root, "2022", "03"), 2))
+
+    def testSavedIndexMissingNewerMonth(self):
+        journaldir.JournalIndex(self.journal_root, self.index_file).save()
+        journaldir.write_filepath("d - a task", os.path.join(self.journal_root, "2022", "03", "blotter-2022-03-01.md"))
+        journal_index = journaldir.JournalIndex(self.journal_root, self.index_file)
+        self.assertNotIn("2022/03", journal_index.months)  # copied in after the index was saved
+        month_dir, story_files, blotter_files = journal_index.find_latest_month_dir(
+            os.path.join(self.journal_root, "2022", "04"), 24)
+        self.assertEqual(os.path.join(self.journal_root, "2022", "03"), month_dir)
+        self.assertEqual(["2021/11", "2022/01", "2022/03"], sorted(journal_index.months.keys()))
+
+    def testSavedIndexDropsStaleMonth(self):
+        journaldir.JournalIndex(self.journal_root, self.index_file).save()
+        for blotter in ["blotter-2022-01-03.md", "blotter-2022-01-04.md"]:
+            os.remove(os.path.join(self.journal_root, "2022", "01", blotter))
+        journal_index = journaldir.JournalIndex(self.journal_root, self.index_file)
+        self.assertIn("2022/01", journal_index.months)  # loaded, not rebuilt
+        month_dir, story_files, blotter_files = journal_index.find_latest_month_dir(
+            os.path.join(self.journal_root, "2022", "02"), 24)
+        self.assertEqual(os.path.join(self.journal_root, "2021", "11"), month_dir)
+        self.assertNotIn("2022/01", journal_index.months)
+
+    def testMonthWithoutBlottersNotListedAgain(self):
+        journaldir.JournalIndex(self.journal_root, self.index_file).save()
+        journal_index = journaldir.JournalIndex(self.journal_root, self.index_file)
+        self.assertIn("2022/02", journal_index.empty_months)  # only notes.txt
+        notes_month_dir = os.path.join(self.journal_root, "2022", "02")
+        listed_dirs = []
+        real_index_month_dir = journal_index.index_month_dir
+
+        def listing_index_month_dir(month_dir):
+            listed_dirs.append(month_dir)
+            return real_index_month_dir(month_dir)
+
+        journal_index.index_month_dir = listing_index_month_dir
+        latest_dir = os.path.join(self.journal_root, "2022", "03")
+        self.assertEqual(os.path.join(self.journal_root, "2022", "01"),
+                         journal_index.find_latest_month_dir(latest_dir, 24)[0])
+        self.assertNotIn(notes_month_dir, listed_dirs)
+        journaldir.write_filepath("d - a task", os.path.join(notes_month_dir, "blotter-2022-02-28.md"))
+        os.utime(notes_month_dir, ns=(0, 0))  # the mtime changes, even on a file system with coarse timestamps
+        self.assertEqual(notes_month_dir, journal_index.find_latest_month_dir(latest_dir, 24)[0])
+
+
+class TestScanDirFiles(TestCase):
+
+    def testScanClassifiesFilesWithMetadata(self):
+        scan_dir = os.path.join(unit_test_tmp_dir.uttd, "scanDirTest")
+        shutil.rmtree(scan_dir, ignore_errors=True)
+        for file_name in ["b story.md", "a story.md", "blotter-2022-01-03.md", "notes.txt"]:
+            journaldir.write_filepath(file_name, os.path.join(scan_dir, file_name))
+        os.makedirs(os.path.join(scan_dir, "dir story.md"))
+        story_entries, blotter_entries = journaldir.scan_dir_files(scan_dir, [apCfg.story_pat, apCfg.blotter_pat])
+        self.assertEqual(["a story.md", "b story.md"], [entry.name for entry in story_entries])
+        self.assertEqual([os.path.join(scan_dir, "blotter-2022-01-03.md")], [entry.path for entry in blotter_entries])
+        self.assertEqual(os.stat(story_entries[0].path).st_mtime_ns, story_entries[0].stat().st_mtime_ns)
+        self.assertEqual(len("a story.md"), story_entries[0].stat().st_size)
+        self.assertEqual([[]], journaldir.scan_dir_files(os.path.join(scan_dir, "missing"), [apCfg.story_pat]))
+
+
+class TestLazyGitImport(TestCase):
+    """GitPython is only imported when the journal repo is used"""
+
+    def gitImportedAfter(self, python_code, **env_vars):
+        check_imports = python_code + "; import sys; print('git' in sys.modules)"
+        result = subprocess.run([sys.executable, "-c", check_imports], capture_output=True, text=True, check=True,
+                                env=dict(os.environ, **env_vars))
+        return result.stdout.strip().splitlines()[-1]
+
+    def testGitImportedOnFirstUse(self):
+        self.assertEqual("False", self.gitImportedAfter("import journaldir"))
+
+    def testNoGitAtStartupWithCommitsOff(self):
+        journal_root = os.path.join(unit_test_tmp_dir.uttd, "noGitJournal")
+        self.assertEqual("False", self.gitImportedAfter("import tlog; tlog.initialize_file_paths()",
+                                                        TLOG_GIT_COMMITS="0", JOURNAL_PATH=journal_root,
+                                                        TLOG_TMP=upo.tmp_root))
+        self.assertFalse(os.path.exists(os.path.join(journal_root, ".git")))
+
+
+class TestGitCommitWritten(TestCase):
+    """commits of only the paths written through journaldir"""
+
+    def setUp(self):
+        self.journal_root = os.path.join(unit_test_tmp_dir.uttd, "gitCommitJournal")
+        shutil.rmtree(self.journal_root, ignore_errors=True)
+        os.makedirs(os.path.join(self.journal_root, "2021", "03"))
+        self.user_paths = copy.copy(upo)
+        self.user_paths.journal_path = self.journal_root
+        self.user_paths.git_init_journal()
+        self.daily_o = types.SimpleNamespace(j_month_dir="2021/03")
+        journaldir.written_paths.take()
+        self.saved_backend = apCfg.git_commit_backend
+
+    def tearDown(self):
+        apCfg.git_commit_backend = self.saved_backend
+
+    def committed_files(self):
+        head_commit = self.user_paths.git_repo_obj.head.commit
+        return sorted(head_commit.stats.files.keys())
+
+    def testStoriesEnrichedInProcessesCommitted(self):
+        endeavor_path = os.path.join(self.journal_root, "Endeavors")
+        journaldir.write_filepath("procGoal 1\n", os.path.join(endeavor_path, "endeavors.txt"))
+        os.makedirs(os.path.join(endeavor_path, apCfg.default_endeavor_name))
+        story_file = os.path.join(endeavor_path, "procGoal", "edited story.md")
+        journaldir.write_filepath("d - a task typed in without attributes\n", story_file)
+        self.user_paths.git_commit_written(self.daily_o, "first run")
+
+        self.user_paths.endeavor_path = endeavor_path
+        self.user_paths.endeavor_file = os.path.join(endeavor_path, "endeavors.txt")
+        self.user_paths.story_cache_file = os.path.join(upo.tmp_root, "test_process_story_cache.json")
+        journaldir.remove_filepath(self.user_paths.story_cache_file)
+        FileSystemDomain(self.user_paths, load_workers=1, parse_processes=2, parse_process_min_chars=0)
+        self.assertIn(story_file, journaldir.written_paths.paths)
+        self.user_paths.git_commit_written(self.daily_o, "enriched stories")
+        self.assertEqual(["Endeavors/procGoal/edited story.md"], self.committed_files())
+
+    def testOnlyWrittenPathsCommitted(self):
+        apCfg.git_commit_backend = journaldir.GitBackend.PORCELAIN
+        self.commitWrittenPaths()
+
+    def testOnlyWrittenPathsCommittedWithPlumbing(self):
+        apCfg.git_commit_backend = journaldir.GitBackend.PLUMBING
+        self.commitWrittenPaths()
+        journal_repo = self.user_paths.git_repo_obj
+        self.assertEqual(1, len(journal_repo.head.commit.parents))
+        self.assertFalse(journal_repo.is_dirty())  # the index and HEAD agree with the work tree
+
+    def commitWrittenPaths(self):
+        journaldir.write_filepath("first", os.path.join(self.journal_root, "2021", "03", "first.md"))
+        self.user_paths.git_commit_written(self.daily_o, "first run")
+        self.assertEqual([], journaldir.written_paths.take())
+
+        journaldir.write_filepath("blotter", os.path.join(self.journal_root, "2021", "03", "blotter.md"))
+        journaldir.move_files(os.path.join(self.journal_root, "2021"),
+                              [os.path.join(self.journal_root, "2021", "03", "first.md")])
+        with open(os.path.join(self.journal_root, "not written by tlog.md"), "w") as untracked_file:
+            untracked_file.write("left alone")
+        journaldir.write_filepath("outside the journal", os.path.join(unit_test_tmp_dir.uttd, "outsideJournal.md"))
+        self.user_paths.git_commit_written(self.daily_o, "second run")
+
+        head_commit = self.user_paths.git_repo_obj.head.commit
+        self.assertEqual("tlog commit: second run 2021/03", head_commit.message.rstrip())  # commit-tree adds a newline
+        self.assertEqual(["2021/03/blotter.md", "2021/03/first.md", "2021/first.md"], self.committed_files())
+        self.assertEqual(["not written by tlog.md"], self.user_paths.git_repo_obj.untracked_files)
+
+
 class TestFileIO(TestCase):
     """
     # test file i/o
@@ -111,6 +302,33 @@ class TestFileIO(TestCase):
         expected_str = journaldir.read_file_str(fileIOPath)
         self.assertEqual(expected_str, tl_testdata.dtask_line)
 
+    def testWriteFileAtomicKeepsOldContentOnFailure(self):
+        """a write that fails part way leaves the old content and no temporary file"""
+        class FailingDoc:
+            def write_to(self, fp):
+                fp.write("partial")
+                raise OSError("disk went away")
+
+        write_dir = os.path.join(unit_test_tmp_dir.uttd, "atomicWriteTest")
+        shutil.rmtree(write_dir, ignore_errors=True)
+        filepath = os.path.join(write_dir, "atomic story.md")
+        journaldir.write_filepath(tl_testdata.dtask_line, filepath)
+        os.chmod(filepath, 0o640)
+        with self.assertRaises(OSError):
+            journaldir.write_file_atomic(FailingDoc(), filepath)
+        self.assertEqual(tl_testdata.dtask_line, journaldir.read_file_str(filepath))
+        self.assertEqual(["atomic story.md"], os.listdir(write_dir))
+        journaldir.write_dir_file("new content", write_dir, "atomic story.md")
+        self.assertEqual("new content", journaldir.read_file_str(filepath))
+        self.assertEqual(0o640, os.stat(filepath).st_mode & 0o777)
+
+    def testDeferredSync(self):
+        filepath = os.path.join(unit_test_tmp_dir.uttd, "deferredSyncTest", "deferred.md")
+        journaldir.write_filepath("d - sync later", filepath, journaldir.FsyncMode.END_OF_RUN)
+        self.assertIn(filepath, journaldir.deferred_sync.paths)
+        self.assertLessEqual(1, journaldir.deferred_sync.sync())
+        self.assertEqual([], journaldir.deferred_sync.paths)
+
     def createDirWithFiles(self, dir: str, files: List[str]):
         """
 
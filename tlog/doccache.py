@@ -0,0 +1,125 @@
+# doccache.py
+"""
+Composition: On disk cache of parsed story documents, so a tlog run only parses the story files that changed
+since the last run.
+
+Each entry is keyed by the story file path and validated by the file's (mtime, size, content hash), and by the
+settings the cached document was enriched with, see fsendeavor.story_enrich_settings().
+The parsed BlotterDocument is stored as the structure returned by BlotterDocument.as_encodable(), which can be
+rehydrated without running any of the line parsing regular expressions.
+"""
+import json
+import logging
+import os
+import threading
+from typing import Dict
+
+import journaldir
+import tlutil
+from tldocument import BlotterDocument
+
+
+class StoryDocCache:
+    """
+    A json file of cache entries:
+        { story file path: { "mtime": ns, "size": bytes, "hash": md5 of text, "settings": [enrichment settings],
+                             "doc": BlotterDocument.as_encodable() } }
+    Entries are kept in least recently used order, so when the cache is saved, entries for files that no longer
+    exist are evicted first, and then the oldest entries are evicted until max_entries remain.
+    """
+
+    default_max_entries = 2000
+    mtime_key = "mtime"
+    size_key = "size"
+    hash_key = "hash"
+    settings_key = "settings"
+    doc_key = "doc"
+
+    def __init__(self, cache_file, max_entries=default_max_entries):
+        self.cache_file = cache_file
+        self.max_entries = max_entries
+        self.entries: Dict[str, Dict] = {}
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()  # FileSystemDomain may load stories from a thread pool
+        self.load()
+
+    def load(self):
+        """Read cache entries from cache_file.  A missing or unreadable cache is treated as empty."""
+        self.entries = {}
+        if not os.path.isfile(self.cache_file):
+            return
+        try:
+            with open(self.cache_file, 'r') as cache_fd:
+                self.entries = json.load(cache_fd)
+        except (OSError, ValueError) as e:
+            logging.getLogger('debuglog').warning(f"ignoring unreadable story cache {self.cache_file}: {e}")
+            self.entries = {}
+
+    def get(self, file_name, file_text, file_stat: os.stat_result = None, settings: list = None) -> BlotterDocument:
+        """
+        Return the cached BlotterDocument for file_name if its mtime, size and the hash of file_text all match
+        the cache entry, and it was cached with the same settings, otherwise None.
+        :param file_stat: stat of file_name already known, e.g. from journaldir.StoryDir.get_file_stat(),
+            otherwise file_name is statted.
+        :param settings: json encodable list of the settings the document is enriched with, as given to put()
+        """
+        entry = self.entries.get(file_name)
+        if entry and entry.get(StoryDocCache.settings_key) == (settings or []) \
+                and self._entry_matches(entry, file_name, file_text, file_stat):
+            with self.lock:
+                self.entries[file_name] = self.entries.pop(file_name, entry)  # most recently used goes to the end
+                self.hits += 1
+            return BlotterDocument.obj_from_encodable(entry[StoryDocCache.doc_key])
+        with self.lock:
+            self.misses += 1
+        return None
+
+    def put(self, file_name, file_text, story_doc: BlotterDocument, settings: list = None):
+        """
+        Cache story_doc as the parse of file_text, which is the current content of file_name.
+        :param settings: json encodable list of the settings story_doc was enriched with.  get() misses unless it
+            is given the same settings.
+        """
+        try:
+            stat = os.stat(file_name)
+        except OSError:
+            return
+        entry = {
+            StoryDocCache.mtime_key: stat.st_mtime_ns,
+            StoryDocCache.size_key: stat.st_size,
+            StoryDocCache.hash_key: tlutil.digest(file_text, short=False),
+            StoryDocCache.settings_key: settings or [],
+            StoryDocCache.doc_key: story_doc.as_encodable()
+        }
+        with self.lock:
+            self.entries.pop(file_name, None)
+            self.entries[file_name] = entry
+
+    def evict(self):
+        """Drop entries for files that no longer exist, then the least recently used beyond max_entries."""
+        for file_name in [f for f in self.entries if not os.path.isfile(f)]:
+            del self.entries[file_name]
+        excess = len(self.entries) - self.max_entries
+        if excess > 0:
+            for file_name in list(self.entries)[0:excess]:
+                del self.entries[file_name]
+
+    def save(self):
+        self.evict()
+        journaldir.write_filepath(json.dumps(self.entries, separators=(',', ':')), self.cache_file,
+                                  journaldir.FsyncMode.NONE)  # a lost cache only costs a re-parse
+
+    @staticmethod
+    def _entry_matches(entry, file_name, file_text, stat: os.stat_result = None):
+        if stat is None:
+            try:
+                stat = os.stat(file_name)
+            except OSError:
+                return False
+        return entry[StoryDocCache.mtime_key] == stat.st_mtime_ns \
+            and entry[StoryDocCache.size_key] == stat.st_size \
+            and entry[StoryDocCache.hash_key] == tlutil.digest(file_text, short=False)
+
+    def __str__(self):
+        return f"story cache entries: {len(self.entries)} hits: {self.hits} misses: {self.misses}"
@@ -8,6 +8,8 @@ and Item objects are instantiated.
 import hashlib
 import logging
 import re
+import sys
+from collections import namedtuple
 from typing import Pattern, Dict, List
 
 from tlutil import digest
@@ -40,14 +42,24 @@ class Section:
 
     head_pat = re.compile("^#")
 
+    # no per instance __dict__: a journal and all its stories make many Sections, Items and ItemAttributes
+    __slots__ = ('item_top_parser_pat', 'current_item', 'header', 'body_items',
+                 'items_by_saved_hash', 'items_by_title', 'items_by_top', 'item_order', 'index_owner')
+
     def __init__(self, item_top_parser_pat, data: str = None) -> None:
-        if not isinstance(item_top_parser_pat, Pattern):
+        if not isinstance(item_top_parser_pat, (Pattern, LeaderDispatchPattern)):
             raise TLogInternalException(
                 "Section __init__ was not passed a Pattern as the first object")
         self.item_top_parser_pat = item_top_parser_pat
         self.current_item = Item(self.item_top_parser_pat)
         self.header = ""
         self.body_items = [self.current_item]
+        # item index, built by the first lookup, then kept in sync by the methods that change body_items
+        self.items_by_saved_hash: Dict[str, List[Item]] = None
+        self.items_by_title: Dict[str, List[Item]] = None  # only Items without a saved title hash
+        self.items_by_top: Dict[str, List[Item]] = None
+        self.item_order: Dict[int, int] = None  # id(Item) -> a number increasing in body_items order
+        self.index_owner = None  # a document with its own item index, told of every change to this one
         if data:
             self.add_section_line(data)
 
@@ -58,8 +70,33 @@ class Section:
             because strings are immutable
             - the each element in the body_items is deep copied to a new list.
             - the attribute dictionary is copied to a new dict
+        No text is serialized or parsed again, so the cost is proportional to the number of Items.
+        """
+        section_copy = Section(self.item_top_parser_pat)
+        section_copy.header = self.header
+        section_copy.body_items = [item.deep_copy(self.item_top_parser_pat) for item in self.body_items]
+        section_copy.current_item = section_copy.body_items[-1]
+        return section_copy
+
+    def as_encodable(self):
+        """Return self as python structures that the json module or other serializers can encode"""
+        return [self.header, [item.as_encodable() for item in self.body_items]]
+
+    @staticmethod
+    def obj_from_encodable(data, item_top_parser_pat) -> 'Section':
+        """
+        Rebuild a Section from the structure returned by as_encodable() without re-parsing any text.
+        :param data: [header, [encoded Item, ...]]
+        :param item_top_parser_pat: the pattern the Section and its Items are constructed with
         """
-        return Section.fromtext(str(self))
+        header, encoded_items = data
+        section = Section(item_top_parser_pat)
+        section.header = header
+        if encoded_items:
+            section.body_items = [Item.obj_from_encodable(encoded_item, item_top_parser_pat)
+                                  for encoded_item in encoded_items]
+            section.current_item = section.body_items[-1]
+        return section
 
     def get_body_data(self):
         """
@@ -86,14 +123,111 @@ class Section:
             i = Item(self.item_top_parser_pat)
             i.set_attrib(akey, aval)
             self.body_items.insert(0, i)
+            self._index_head_item()
+
+    def build_item_index(self):
+        """
+        Index body_items by saved 'titleHash:' attribute, by title (for Items with no saved title hash, matching
+        find_item() rules) and by top.  Each key maps to the list of Items having it, since keys may repeat.
+        Items let the Sections indexing them know when their keys change, see Item.indexing_sections.
+        If index_owner is set, it is passed the same changes through its add_index_keys() and remove_index_keys().
+        item_order records where each Item is in body_items, so the index lists need not be kept in body order
+        (see item_position()).  The numbers are only compared: an Item inserted at the head is numbered one below
+        the old head, an appended one one above the old tail, and removals leave gaps.
+        """
+        if self.items_by_top is not None:
+            return
+        self.items_by_saved_hash, self.items_by_title, self.items_by_top = {}, {}, {}
+        self.item_order = {}
+        for order, item in enumerate(self.body_items):
+            self._index_item(item, order)
+
+    def _index_item(self, item: 'Item', order: int):
+        if self.items_by_top is None:
+            return
+        self.item_order[id(item)] = order
+        self._add_index_keys(item, item.get_index_keys())
+        item.indexing_sections += (self,)
+
+    def _index_head_item(self):
+        """Index body_items[0], just inserted ahead of the rest"""
+        if self.items_by_top is not None:
+            self._index_item(self.body_items[0], self.item_position(self.body_items[1]) - 1)
+
+    def _index_tail_item(self):
+        """Index body_items[-1], just appended after the rest"""
+        if self.items_by_top is not None:
+            self._index_item(self.body_items[-1], self.item_position(self.body_items[-2]) + 1)
+
+    def _unindex_item(self, item: 'Item'):
+        if self.items_by_top is None:
+            return
+        self._remove_index_keys(item, item.get_index_keys())
+        del self.item_order[id(item)]
+        item.indexing_sections = tuple(s for s in item.indexing_sections if s is not self)
+
+    def item_position(self, item: 'Item') -> int:
+        """:return: a number ordering item, one of body_items, by its place in body_items.  Needs the item index."""
+        return self.item_order[id(item)]
+
+    def reindex_item(self, item: 'Item', old_keys):
+        """Called by item when the keys returned by item.get_index_keys() have changed from old_keys"""
+        self._remove_index_keys(item, old_keys)
+        self._add_index_keys(item, item.get_index_keys())
+
+    def _add_index_keys(self, item, keys):
+        saved_hash, title, top = keys
+        if saved_hash:
+            self.items_by_saved_hash.setdefault(saved_hash, []).append(item)
+        else:
+            self.items_by_title.setdefault(title, []).append(item)
+        self.items_by_top.setdefault(top, []).append(item)
+        if self.index_owner:
+            self.index_owner.add_index_keys(self, item, keys)
+
+    def _remove_index_keys(self, item, keys):
+        saved_hash, title, top = keys
+        if saved_hash:
+            Section._remove_from_key(self.items_by_saved_hash, saved_hash, item)
+        else:
+            Section._remove_from_key(self.items_by_title, title, item)
+        Section._remove_from_key(self.items_by_top, top, item)
+        if self.index_owner:
+            self.index_owner.remove_index_keys(self, item, keys)
+
+    @staticmethod
+    def _remove_from_key(index: Dict, key, item):
+        """remove item (not an equal one) from the list of items under key in index"""
+        items = index.get(key)
+        if items:
+            for i, indexed_item in enumerate(items):
+                if indexed_item is item:
+                    del items[i]
+                    break
+            if not items:
+                del index[key]
+
+    def _first_in_body(self, items):
+        """:return: whichever of items comes first in body_items, or None"""
+        if not items:
+            return None
+        if len(items) == 1:
+            return items[0]
+        return min(items, key=self.item_position)
+
+    def _replace_body_item(self, index, new_item):
+        old_item = self.body_items[index]
+        order = self.item_position(old_item) if self.items_by_top is not None else None
+        self._unindex_item(old_item)
+        self.body_items[index] = new_item
+        self._index_item(new_item, order)
 
     @classmethod
     def fromtext(cls, item_top_parser_pat, text):
         "create a Section from multiline text parameter"
         new_section = Section(item_top_parser_pat)
-        lines = text.split("\n")
-        for line in lines:
-            new_section.add_section_line(line)
+        for token in tokenize_lines(text.split("\n"), item_top_parser_pat):
+            new_section.add_section_token(token)
         return new_section
 
     def add_section_line(self, data):
@@ -101,20 +235,28 @@ class Section:
         Used for building up sections and items line by line from text strings.
         See doc under BlotterDocument.add_line()
         """
-        if Section.head_pat.match(data):
+        return self.add_section_token(tokenize_line(data, self.item_top_parser_pat))
+
+    def add_section_token(self, token: 'LineToken'):
+        """
+        add_section_line() for a line that has already been classified by tokenize_line()
+        """
+        if token.kind == LineKind.HEADING:
             # print("trying to add a section header data:", data)
-            self.header = data
+            self.header = token.data
         else:
             if self.current_item.is_empty():
                 # print("adding data to item that was empty:", data)
-                self.current_item.add_item_line(data)
+                self.current_item.add_item_token(token)
             else:
-                if self.item_top_parser_pat.match(data):
-                    self.current_item = Item(self.item_top_parser_pat, data)  # new Item
+                if token.kind == LineKind.TASK:
+                    self.current_item = Item(self.item_top_parser_pat)  # new Item
+                    self.current_item.add_item_token(token)
                     self.body_items.append(self.current_item)  # add to section body_items
+                    self._index_tail_item()
                 else:
                     # print("gotta add the data to current item in section")
-                    self.current_item.add_item_line(data)
+                    self.current_item.add_item_token(token)
         return self.current_item
 
     def add_item(self, arg_item, head_insert: bool = False):
@@ -131,19 +273,21 @@ class Section:
 
             # Sections are created with an empty first Item, which should be used if it is empty
             if self.body_items[0].is_empty():
-                self.body_items[0] = arg_item
+                self._replace_body_item(0, arg_item)
                 return
 
-            for body_item in self.body_items:
-                if body_item.top == arg_item.top:
-                    body_item.subs = list(arg_item.subs)
-                    need_append = False
+            self.build_item_index()
+            for body_item in self.items_by_top.get(arg_item.top, ()):
+                body_item.subs = list(arg_item.subs)
+                need_append = False
 
             if need_append:
                 if head_insert:
                     self.body_items.insert(0, arg_item)
+                    self._index_head_item()
                 else:
                     self.body_items.append(arg_item)
+                    self._index_tail_item()
         else:
             raise TLogInternalException("Section.add_item was given a non-Item")
 
@@ -152,22 +296,36 @@ class Section:
         Returns body_items items as a string.
         Prevents adding an extra newline if there is an empty Item.
         """
-        aString = ""
-        # print("DEBUG str(self.body_items):" + str(self.body_items))
+        return "".join(self.body_parts())
+
+    def body_parts(self):
+        """Generate the strings that str_body() joins, in one pass over body_items"""
+        wrote_text = False
         for item in self.body_items:
-            if aString and not item.is_empty():
-                aString += "\n"  # some markdowns want 2 '\n' here.
             if not item.is_empty():
-                aString += str(item)
-        # print("DEBUG aString:" + aString + ":after aString")
-        return aString
+                if wrote_text:
+                    yield "\n"  # some markdowns want 2 '\n' here.
+                item_str = str(item)
+                yield item_str
+                wrote_text = wrote_text or bool(item_str)
+
+    def str_parts(self):
+        """Generate the strings that __str__() joins.  The header newline is only written ahead of body text."""
+        if self.header:
+            yield self.header
+        header_newline = "\n" if self.header else ""
+        for part in self.body_parts():
+            if part and header_newline:
+                yield header_newline
+                header_newline = ""
+            yield part
+
+    def write_to(self, fp):
+        """Write str(self) to the text file object fp without building the whole string"""
+        fp.writelines(self.str_parts())
 
     def __str__(self):
-        # got to be a more concise way to do this.
-        header_str = self.header if self.header else ""
-        body_str = self.str_body()
-        header_newline = "\n" if self.header and body_str else ""
-        return header_str + header_newline + body_str
+        return "".join(self.str_parts())
 
     def is_attrib_section(self):
         """
@@ -236,6 +394,10 @@ class Section:
         :param aval: attribute value indicating a match.
         :return: the matching Item from self.body_items
         """
+        if akey == Item.title_hash_attr_str and aval:
+            self.build_item_index()
+            item = self._first_in_body(self.items_by_saved_hash.get(aval))
+            return item.get_item_attrib_holder(akey) if item else None
         item: Item
         for item in self.body_items:
             item_attribute: ItemAttribute = item.get_item_attrib_holder(akey)
@@ -262,7 +424,7 @@ class Section:
                 print(f"found item matching {hash_attr_str} to replace")
                 print(f"replacing item:\n{item}")
                 print(f"with item:\n{new_item}")
-                self.body_items[index] = new_item
+                self._replace_body_item(index, new_item)
                 return item  # this is the old item.  is it of any use?
             index += 1
         return None
@@ -272,34 +434,36 @@ class Section:
         tag = "remove_item()"
         body_item = self.find_item(item)
         logging.debug(f"{tag}: try to remove find_item({id(item)}) return of self.find_item(item): {id(body_item)}")
+        self.remove_body_item(body_item)
+
+    def remove_body_item(self, body_item):
+        """remove body_item itself, already found in body_items, e.g. by find_item()"""
         self.body_items.remove(body_item)
+        self._unindex_item(body_item)
 
     def find_item(self, other_item):
-        """Return a reference to the an item with a saved 'titleHash:' attribute or title matching item."""
-        for item in self.body_items:
-            item_sth = item.get_saved_title_hash()
-            if item_sth:
-                if item_sth == other_item.get_saved_title_hash():
-                    return item
-            else:
-                if item.get_title() == other_item.get_title():
-                    return item
-        return None
+        """
+        Return a reference to the first item with a saved 'titleHash:' attribute matching item's, or,
+        for items without a saved 'titleHash:', a title matching item's.
+        """
+        return self._first_in_body(self._matching_items(other_item))
+
+    def _matching_items(self, other_item):
+        """:return: a new list of the items find_item() rules match other_item to, not in body_items order"""
+        self.build_item_index()
+        other_sth = other_item.get_saved_title_hash()
+        matching_items = list(self.items_by_saved_hash.get(other_sth, ())) if other_sth else []
+        matching_items.extend(self.items_by_title.get(other_item.get_title(), ()))
+        return matching_items
 
     def add_item_merge_enhanced(self, other_item):
         """match on titleHash if found, but use title if the target object does not have a saved title hash"""
-        match_existing_found = False
-        for item in self.body_items:
-            item_sth = item.get_saved_title_hash()
-            # print("Section:add_item_merge:self.item", item.top)
-            if item_sth:
-                if item_sth == other_item.get_saved_title_hash():
-                    match_existing_found = True
-                    item.merge_parts(other_item)
-            else:
-                # item has no sth, so compare the part of the title without the leader.
-                if item.get_title() == other_item.get_title():
-                    item.merge_parts(other_item)
+        self.build_item_index()
+        other_sth = other_item.get_saved_title_hash()
+        match_existing_found = bool(other_sth and other_sth in self.items_by_saved_hash)
+        # items with no sth are compared on the part of the title without the leader.
+        for item in self._matching_items(other_item):
+            item.merge_parts(other_item)
         if not match_existing_found:
             # print("adding item:\n", str(other_item) )
             self.add_item(other_item) # why does this put other_item at the beginning of the body_items list
@@ -334,14 +498,64 @@ class TLogInternalException(Exception):
         return repr(self.value)
 
 
+class LeaderDispatchPattern:
+    """
+    Stands in for a compiled top_parser_pat regex when every leader begins with one of a known set of characters.
+    Rather than evaluate one alternation of all the leader patterns, match() looks up the first character of the
+    line and evaluates the single precompiled pattern for that leader, which has the same 2 groupings:
+    (leader, title).
+    Each leader carries a value supplied by the caller (tldocument uses its Status) that classify() returns.
+    """
+
+    def __init__(self, title_group_str: str):
+        self.title_group_str = title_group_str
+        self.first_char_dict: Dict[str, tuple] = {}  # first char -> (leader pattern, top pattern, value)
+
+    def add_leader(self, leader_chars: str, leader_pat: Pattern, value=None):
+        """
+        :param leader_chars: each character a line with this leader can begin with
+        :param leader_pat: compiled pattern matching the leader at the beginning of a line, such as '^[dD] *-'
+        :param value: returned by classify() and match_leader() for lines with this leader
+        """
+        top_pat = re.compile("(" + leader_pat.pattern + ")" + self.title_group_str)
+        for leader_char in leader_chars:
+            self.first_char_dict[leader_char] = (leader_pat, top_pat, value)
+
+    def match(self, data):
+        """Like Pattern.match(): return a match object with groups (leader, title), or None"""
+        dispatch = self.first_char_dict.get(data[:1])
+        if dispatch:
+            return dispatch[1].match(data)
+        return None
+
+    def classify(self, data):
+        """Return (value, leader, title) if data is a line with a leader and a title, otherwise None"""
+        dispatch = self.first_char_dict.get(data[:1])
+        if dispatch:
+            topmo = dispatch[1].match(data)
+            if topmo:
+                return dispatch[2], topmo.group(1), topmo.group(2)
+        return None
+
+    def match_leader(self, data):
+        """Return (leader pattern, value) if data begins with a leader, even with no title, otherwise None"""
+        dispatch = self.first_char_dict.get(data[:1])
+        if dispatch and dispatch[0].match(data):
+            return dispatch[0], dispatch[2]
+        return None
+
+
 class ItemAttribute:
     "T Log Attribute"
     delim = ':'
     attr_str = r'^(\w+)' + delim + r'(.*)'
     attr_pat = re.compile(attr_str)
 
+    __slots__ = ('name', 'value')
+
     def __init__(self, attr_name, attr_val):
-        self.name = attr_name
+        # attribute names recur on nearly every Item (storySource, titleHash ...), so all share one str per name
+        self.name = sys.intern(attr_name) if type(attr_name) is str else attr_name
         self.value = attr_val
 
     @classmethod
@@ -349,7 +563,8 @@ class ItemAttribute:
         "Create an attribute from a data line.  (e. g. a string read from a file)"
         attmo = ItemAttribute.attr_pat.match(data)  # return attribute match object
         if attmo:
-            return ItemAttribute(attmo.group(1), attmo.group(2))
+            # values such as a storySource path repeat on every item of a story, so parsed values are shared too
+            return ItemAttribute(attmo.group(1), sys.intern(attmo.group(2)))
         else:
             return None
 
@@ -364,21 +579,83 @@ class Item:
 
     title_hash_attr_str = "titleHash"
 
+    __slots__ = ('indexing_sections', '_top', '_top_parts', '_title_hash', 'subs', 'attribs', '_attribs_text',
+                 'top_parser_pat')
+
     def __init__(self, top_parser_pat, data:str=None, subs:[str]=None, attrs:Dict[str, ItemAttribute]=None):
-        self.top = ""
+        self.indexing_sections = ()  # Sections with self in their item index, see Section.reindex_item()
+        self.top = ""  # also resets the parsed top parts, see the top property
         self.subs = subs or []
         self.attribs = attrs or dict()
+        self._attribs_text = None  # attribs_str(), rendered once until an attribute is put
         self.top_parser_pat = top_parser_pat
         if data:
             self.add_item_line(data)
 
+    def _get_top(self):
+        "getter for top"
+        return self._top
+
+    def _set_top(self, top):
+        """
+        setter for top.  Discards the leader, title, status and title hash parsed from the previous top,
+        so they are parsed again, once, the next time one of them is needed.
+        """
+        self._replace_top(top, None)
+
+    top = property(_get_top, _set_top)
+
+    def set_parsed_top(self, top, leader, title, status=None):
+        """Set top along with the leader, title and status already parsed from it (e.g. by tokenize_line())"""
+        self._replace_top(top, (leader, title, status))
+
+    def _replace_top(self, top, top_parts):
+        old_keys = self.get_index_keys() if self.indexing_sections else None
+        self._top = top
+        self._top_parts = top_parts
+        self._title_hash = None
+        if old_keys:
+            self._reindex(old_keys)
+
+    def get_index_keys(self):
+        """:return: (saved title hash, title, top), the keys a Section indexes self by"""
+        return self.get_saved_title_hash(), self.get_title(), self._top
+
+    def _reindex(self, old_keys):
+        """Tell each Section indexing self that self is no longer found by old_keys"""
+        if old_keys != self.get_index_keys():
+            for section in self.indexing_sections:
+                section.reindex_item(self, old_keys)
+
+    def _put_attrib(self, attr: ItemAttribute):
+        old_keys = self.get_index_keys() \
+            if self.indexing_sections and attr.name == Item.title_hash_attr_str else None
+        self.attribs[attr.name] = attr
+        self._attribs_text = None
+        if old_keys:
+            self._reindex(old_keys)
+
+    def _get_top_parts(self):
+        """
+        :return: (leader, title, status) parsed from top with top_parser_pat, parsed only once per top.
+            status is only known if top_parser_pat is a LeaderDispatchPattern.
+            All are None if top is not a task line.
+        """
+        if self._top_parts is None:
+            if isinstance(self.top_parser_pat, LeaderDispatchPattern):
+                classified = self.top_parser_pat.classify(self._top)
+                self._top_parts = (classified[1], classified[2], classified[0]) if classified else (None, None, None)
+            else:
+                topmo = self.top_parser_pat.match(self._top)  # return top match object
+                self._top_parts = (topmo.group(1), topmo.group(2), None) if topmo else (None, None, None)
+        return self._top_parts
+
     @classmethod
     def fromtext(cls, top_parser_pat, text):
         """create an Item from multiline text parameter"""
         new_item = Item(top_parser_pat)
-        lines = text.split("\n")
-        for line in lines:
-            new_item.add_item_line(line)
+        for token in tokenize_lines(text.split("\n"), top_parser_pat):
+            new_item.add_item_token(token)
         return new_item
 
     def attrib_by_line(self, data):
@@ -389,7 +666,7 @@ class Item:
         """
         attr = ItemAttribute.fromline(data)
         if attr:
-            self.attribs[attr.name] = attr
+            self._put_attrib(attr)
             return attr
         else:
             return None
@@ -407,7 +684,7 @@ class Item:
 
     def set_attrib(self, akey, aval):
         """Set Item attributes given akey and aval"""
-        self.attribs[akey] = ItemAttribute(akey, aval)
+        self._put_attrib(ItemAttribute(akey, aval))
 
     def get_item_attrib_holder(self, akey) -> ItemAttribute:
         """Get Item attrib for key, returning TLAttribute object that has both key and val"""
@@ -426,13 +703,7 @@ class Item:
         See also tldocument.find_status_name() which can find the semantic name for the leader returned by this
         method.
         """
-        # print("regex string:" + Item.top_parser_str + ":")
-        item_top = self.top
-        topmo = self.top_parser_pat.match(item_top)  # return top match object
-        if topmo:
-            return topmo.group(1)
-        else:
-            return None
+        return self._get_top_parts()[0]
 
     def get_title(self):
         """
@@ -442,24 +713,29 @@ class Item:
         The second grouping match will be returned if a valid leader is found
         otherwise None is returned.
         """
-        item_top = self.top
-        topmo = self.top_parser_pat.match(item_top)  # return top match object
-        if topmo:
-            return topmo.group(2)
-        else:
-            return None
+        return self._get_top_parts()[1]
+
+    def get_status(self):
+        """
+        The status value that the top_parser_pat LeaderDispatchPattern associates with the leader (tldocument uses
+        its Status), or None.
+        """
+        return self._get_top_parts()[2]
 
     # https://stackoverflow.com/questions/2510716/short-python-alphanumeric-hash-with-minimal-collisions
     def get_title_hash(self):
         """returns a hash of the title if there is a title
-        otherwise returns an empty string"""
-        my_title = self.get_title()
-        if my_title:
-            hex_digest_of_md5_of_byte_encode_of_title = digest(my_title)
-            # print("hex md5 title: {}".format(hex_digest_of_md5_of_byte_encode_of_title))
-            return hex_digest_of_md5_of_byte_encode_of_title[0:10]
-        else:
-            return ''
+        otherwise returns an empty string
+        The hash is computed once per top."""
+        if self._title_hash is None:
+            my_title = self.get_title()
+            if my_title:
+                hex_digest_of_md5_of_byte_encode_of_title = digest(my_title)
+                # print("hex md5 title: {}".format(hex_digest_of_md5_of_byte_encode_of_title))
+                self._title_hash = hex_digest_of_md5_of_byte_encode_of_title[0:10]
+            else:
+                self._title_hash = ''
+        return self._title_hash
 
     def save_title_hash(self):
         """
@@ -494,36 +770,80 @@ class Item:
 
     def add_item_line(self, data):
         """Add a line as either the top task, an attribute, or sub text"""
-        if Section.head_pat.match(data):
+        self.add_item_token(tokenize_line(data, self.top_parser_pat))
+
+    def add_item_token(self, token: 'LineToken'):
+        """add_item_line() for a line that has already been classified by tokenize_line()"""
+        if token.kind == LineKind.HEADING:
             raise TLogInternalException(
                 "Putting a Section.head_pat line inside a Item is not allowed: " +
-                data)
+                token.data)
 
-        if self.top_parser_pat.match(data):
-            self.top = data
+        if token.kind == LineKind.TASK:
+            self.set_parsed_top(token.data, token.leader, token.title, token.status)
+        elif token.kind == LineKind.ATTRIBUTE:
+            self._put_attrib(token.attrib)
         else:
-            if not self.attrib_by_line(data):
-                self.subs.append(data)
+            self.subs.append(token.data)
 
     def merge_parts(self, other_item):
         """
         updates self to match other_item (kind of the inverse of deep_copy)
         references to the original 'self' object will be unaffected.
         """
-        self.top = other_item.top
+        old_keys = self.get_index_keys() if self.indexing_sections else None
+        self._top = other_item.top
+        if other_item.top_parser_pat is self.top_parser_pat:  # other_item's parsed top parts are valid for self
+            self._top_parts = other_item._top_parts
+            self._title_hash = other_item._title_hash
+        else:
+            self._top_parts = None
+            self._title_hash = None
         self.subs = list(other_item.subs)
         self.attribs = dict(other_item.attribs)
+        self._attribs_text = other_item._attribs_text
+        if old_keys:
+            self._reindex(old_keys)
 
 
-    def deep_copy(self, top_parser_pat):
+    def deep_copy(self, top_parser_pat=None):
         """
         Makes a copy where
          - the top element refers to the same top string, which is ok
            because strings are immutable
          - the subs list is copied to a new list.
-         - the attribute dictionary is copied to a new dict
+         - the attribute dictionary is copied to a new dict, sharing the ItemAttribute objects, which are
+           replaced rather than changed by set_attrib()
+        top is not parsed again if the copy uses the same top_parser_pat (the default).
         """
-        return Item(top_parser_pat, data=self.top, subs=list(self.subs), attrs=dict(self.attribs))
+        top_parser_pat = top_parser_pat or self.top_parser_pat
+        item_copy = Item(top_parser_pat, subs=list(self.subs), attrs=dict(self.attribs))
+        item_copy._attribs_text = self._attribs_text
+        if top_parser_pat is self.top_parser_pat:
+            item_copy._top = self._top
+            item_copy._top_parts = self._top_parts
+            item_copy._title_hash = self._title_hash
+        else:
+            item_copy.top = self._top
+        return item_copy
+
+    def as_encodable(self):
+        """Return self as python structures that the json module or other serializers can encode"""
+        return [self.top, list(self.subs), [[attr.name, attr.value] for attr in self.attribs.values()]]
+
+    @staticmethod
+    def obj_from_encodable(data, top_parser_pat) -> 'Item':
+        """
+        Rebuild an Item from the structure returned by as_encodable() without re-parsing any text.
+        :param data: [top, [sub, ...], [[attribute name, attribute value], ...]]
+        :param top_parser_pat: the pattern the Item is constructed with
+        """
+        top, subs, attribs = data
+        item = Item(top_parser_pat, subs=list(subs),
+                    attrs={name: ItemAttribute(name, sys.intern(value) if type(value) is str else value)
+                           for name, value in attribs})
+        item.top = top
+        return item
 
     def has_top(self):
         if self.top:
@@ -541,10 +861,11 @@ class Item:
         return boolean_return_of_is_attrib_only
 
     def attribs_str(self):
-        if len(self.attribs):
-            return "\n".join(sorted({str(self.attribs[x]) for x in self.attribs.keys()}))
-        else:
-            return ""
+        """The attribute lines, sorted.  Sorted once, then kept until _put_attrib() changes an attribute."""
+        if self._attribs_text is None:
+            # keys are unique, no set needed
+            self._attribs_text = "\n".join(sorted([str(attr) for attr in self.attribs.values()]))
+        return self._attribs_text
 
     def detail_str(self):
         return "\n".join(self.subs) if len(self.subs) != 0 else ""
@@ -572,6 +893,54 @@ class Item:
         return self
 
 
+class LineKind:
+    """The kinds of LineToken that tokenize_line() classifies lines into."""
+    HEADING = "heading"
+    TASK = "task"
+    ATTRIBUTE = "attribute"
+    BLANK = "blank"
+    TEXT = "text"
+
+
+# A line classified once by tokenize_line() so Documents, Sections and Items can be built without matching it again.
+#   kind: a LineKind value
+#   data: the line itself
+#   leader, title: the groupings of top_parser_pat for a TASK
+#   status: the LeaderDispatchPattern value for a TASK, if top_parser_pat is a LeaderDispatchPattern
+#   attrib: the ItemAttribute for an ATTRIBUTE
+LineToken = namedtuple('LineToken', ['kind', 'data', 'leader', 'title', 'status', 'attrib'])
+
+
+def tokenize_line(data: str, top_parser_pat) -> LineToken:
+    """
+    Classify data as a heading, a task matching top_parser_pat, an attribute, a blank line, or other text,
+    checking in the same order that Section.add_section_line() and Item.add_item_line() always have.
+    """
+    if Section.head_pat.match(data):
+        return LineToken(LineKind.HEADING, data, None, None, None, None)
+    if isinstance(top_parser_pat, LeaderDispatchPattern):
+        classified = top_parser_pat.classify(data)
+        if classified:
+            status, leader, title = classified
+            return LineToken(LineKind.TASK, data, leader, title, status, None)
+    else:
+        topmo = top_parser_pat.match(data)
+        if topmo:
+            return LineToken(LineKind.TASK, data, topmo.group(1), topmo.group(2), None, None)
+    attr = ItemAttribute.fromline(data)
+    if attr:
+        return LineToken(LineKind.ATTRIBUTE, data, None, None, None, attr)
+    if not data or data.isspace():
+        return LineToken(LineKind.BLANK, data, None, None, None, None)
+    return LineToken(LineKind.TEXT, data, None, None, None, None)
+
+
+def tokenize_lines(lines, top_parser_pat):
+    """Generate a LineToken for each line, without any trailing newline."""
+    for line in lines:
+        yield tokenize_line(line.rstrip("\n"), top_parser_pat)
+
+
 class SectionSortDoc:
     """
     This class is a parsing and sorting class.   Its categories are Sections, and data are added to those
@@ -641,9 +1010,19 @@ class SectionSortDoc:
                            + " (" + repr(self.leader_instance_dict[leader]) + ")"
                            for leader in self.leader_instance_dict.keys()])
 
+    def str_parts(self):
+        """Generate the strings that __str__() joins"""
+        for n, section in enumerate(self.head_instance_dict.values()):
+            if n:
+                yield "\n"
+            yield from section.str_parts()
+
+    def write_to(self, fp):
+        """Write str(self) to the text file object fp without building the whole string"""
+        fp.writelines(self.str_parts())
+
     def __str__(self):
-        ds = "\n".join([str(self.head_instance_dict[s]) for s in self.head_instance_dict.keys()])
-        return ds
+        return "".join(self.str_parts())
 
     def get_report_str(self, report_section_names: List[str]):
         """
@@ -661,7 +1040,15 @@ class SectionSortDoc:
     def insert_item(self, item: Item):
         """
         Side effect: insert Item in first matching section in leader_instance_dict
-        Return the instance from leader_instance_dict matching item.top or None"""
+        Return the instance from leader_instance_dict matching item.top or None
+        If item_top_parser_pat is a LeaderDispatchPattern and the leader pattern it finds for item.top was given to
+        add_leader_entry(), the section is looked up directly instead of trying each leader pattern in turn."""
+        if isinstance(self.item_top_parser_pat, LeaderDispatchPattern):
+            leader_match = self.item_top_parser_pat.match_leader(item.top)
+            if leader_match and leader_match[0] in self.leader_instance_dict:
+                section_match: Section = self.leader_instance_dict[leader_match[0]]
+                section_match.add_item_merge_enhanced(item)
+                return section_match
         for key_pat in self.leader_instance_dict.keys():
             if key_pat.match(item.top):
                 section_match: Section = self.leader_instance_dict[key_pat]
@@ -24,12 +24,15 @@
 # }
 import os
 import re
-from typing import List
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Tuple, Dict
 
 import journaldir
 import tldocument
 from endeavor import Endeavor, Story, Task, EffortDomain
 from journaldir import UserPaths, read_file_str, StoryDir
+from doccache import StoryDocCache
 from tlconst import apCfg
 
 
@@ -38,14 +41,33 @@ from tldocument import BlotterDocument
 
 
 class FileSystemDomain:
+    """
+    Loads the Endeavors listed in endeavors.txt, in that order, each with its stories in prioritized order.
+    With load_workers > 1, StoryDir listings and story files are read, parsed and re-saved concurrently on a
+    bounded thread pool, which helps when file system latency dominates (e.g. a network mounted home directory).
+    With parse_processes > 0, story files that miss the doc_cache are parsed in a pool of worker processes
+    (see parse_story_text_for_transfer()), but only when their combined text is at least parse_process_min_chars,
+    so small domains do not pay for starting the worker processes.
+    """
 
-    def __init__(self, path_object: UserPaths):
+    def __init__(self, path_object: UserPaths, load_workers: int = apCfg.load_workers,
+                 parse_processes: int = apCfg.parse_processes,
+                 parse_process_min_chars: int = apCfg.parse_process_min_chars):
         self.endeavor_path = path_object.endeavor_path
         self.endeavor_file = path_object.endeavor_file
+        self.load_workers = load_workers
+        self.parse_processes = parse_processes
+        self.parse_process_min_chars = parse_process_min_chars
         self.file_system_endeavors: [FileSystemEndeavor] = []
+        self.doc_cache = StoryDocCache(path_object.story_cache_file)
         self.load_fs_endeavors()
+        self.doc_cache.save()
 
-    def load_fs_endeavors(self):
+    def get_endeavor_specs(self) -> List[Tuple[str, str]]:
+        """
+        :return: list of (max_stories, endeavor directory path) in endeavors.txt order, after the default endeavor.
+        """
+        endeavor_specs: List[Tuple[str, str]] = []
         endeavor_text: str = apCfg.default_endeavor_name + " 2" + "\n" + read_file_str(self.endeavor_file)
         endeavor_text = endeavor_text.rstrip()
         for data_line in endeavor_text.split('\n'):
@@ -57,10 +79,90 @@ class FileSystemDomain:
             else:
                 endeavor_name = matched.group(1)
                 max_stories = matched.group(2)
+            endeavor_specs.append((max_stories, os.path.join(self.endeavor_path, endeavor_name)))
+        return endeavor_specs
+
+    def load_fs_endeavors(self):
+        endeavor_specs = self.get_endeavor_specs()
+        if self.load_workers > 1 or self.parse_processes > 0:
+            self.file_system_endeavors += self.load_fs_endeavors_concurrently(endeavor_specs)
+            return
+        for max_stories, endeavor_dir in endeavor_specs:
             self.file_system_endeavors.append(
-                        FileSystemEndeavor(max_stories, StoryDir(os.path.join(self.endeavor_path, endeavor_name)))
+                        FileSystemEndeavor(max_stories, StoryDir(endeavor_dir), self.doc_cache,
+                                           endeavor_path=self.endeavor_path)
             )
 
+    def load_fs_endeavors_concurrently(self, endeavor_specs: List[Tuple[str, str]]) -> List['FileSystemEndeavor']:
+        """
+        Build the StoryDirs, then load every story file, on a pool of self.load_workers threads, or in worker
+        processes per load_story_files_in_processes().
+        pool.map() returns results in submission order, so the endeavor order and the prioritized story order
+        within each endeavor are the same as a sequential load.
+        A story file listed under more than one endeavor is only loaded once, so no two workers write it.
+        The thread pool is shut down before any worker processes are forked, since forking while other threads
+        hold locks (logging, imports) can deadlock the child.
+        """
+        with ThreadPoolExecutor(max_workers=max(self.load_workers, 1)) as pool:
+            story_dirs: List[StoryDir] = list(pool.map(StoryDir, [spec[1] for spec in endeavor_specs]))
+        story_files = list(dict.fromkeys([s_file for story_dir in story_dirs for s_file in story_dir.story_list]))
+        file_stats = {s_file: story_dir.get_file_stat(s_file)
+                      for story_dir in story_dirs for s_file in story_dir.story_list}
+        if self.parse_processes > 0:
+            story_docs: Dict[str, BlotterDocument] = self.load_story_files_in_processes(story_files, file_stats)
+        else:
+            with ThreadPoolExecutor(max_workers=max(self.load_workers, 1)) as pool:
+                loaded_docs = pool.map(lambda s_file: load_and_resave_story_file_with_attribs(
+                                           s_file, self.doc_cache, file_stats[s_file], self.endeavor_path),
+                                       story_files)
+                story_docs: Dict[str, BlotterDocument] = dict(zip(story_files, loaded_docs))
+        return [FileSystemEndeavor(max_stories, story_dir,
+                                   story_docs=[story_docs[s_file] for s_file in story_dir.story_list])
+                for (max_stories, endeavor_dir), story_dir in zip(endeavor_specs, story_dirs)]
+
+    def load_story_files_in_processes(self, story_files: List[str],
+                                      file_stats: Dict[str, os.stat_result] = None) -> Dict[str, BlotterDocument]:
+        """
+        Story files found in the doc_cache are rehydrated here.  The rest are parsed in self.parse_processes worker
+        processes if their combined text reaches self.parse_process_min_chars, otherwise in this process.
+        Workers send back BlotterDocument.as_encodable() structures rather than pickled Section and Item objects,
+        and they are rehydrated into BlotterDocuments here.
+        :param file_stats: stats of the story files from their directory listing, for the doc_cache.
+        :return: dict of story file path -> BlotterDocument
+        """
+        file_stats = file_stats or {}
+        story_docs: Dict[str, BlotterDocument] = {}
+        uncached_texts: Dict[str, str] = {}
+        for s_file in story_files:
+            file_text = read_file_str(s_file)
+            cached_doc = self.doc_cache.get(s_file, file_text, file_stats.get(s_file),
+                                            story_enrich_settings(self.endeavor_path))
+            if cached_doc:
+                story_write_counts.count(written=False)  # cached docs are already enriched
+                story_docs[s_file] = cached_doc
+            else:
+                uncached_texts[s_file] = file_text
+
+        if sum(len(file_text) for file_text in uncached_texts.values()) < self.parse_process_min_chars:
+            for s_file, file_text in uncached_texts.items():
+                story_docs[s_file] = resave_story_text_with_attribs(s_file, file_text, self.doc_cache,
+                                                                    self.endeavor_path)
+            return story_docs
+
+        from concurrent.futures import ProcessPoolExecutor  # imports multiprocessing, only needed here
+        with ProcessPoolExecutor(max_workers=self.parse_processes) as process_pool:
+            transfers = process_pool.map(parse_story_text_for_transfer, uncached_texts.keys(), uncached_texts.values(),
+                                         [self.endeavor_path] * len(uncached_texts),
+                                         chunksize=max(1, len(uncached_texts) // (self.parse_processes * 4)))
+            for s_file, (encoded_doc, story_text, changed) in zip(uncached_texts.keys(), transfers):
+                story_doc = BlotterDocument.obj_from_encodable(encoded_doc)
+                if changed:
+                    journaldir.write_filepath(story_text, s_file)
+                story_write_counts.count(changed)
+                self.doc_cache.put(s_file, story_text, story_doc, story_enrich_settings(self.endeavor_path))
+                story_docs[s_file] = story_doc
+        return story_docs
+
     def get_all_story_dirs(self):
         return [fse.story_dir for fse in self.file_system_endeavors]
 
@@ -82,11 +184,22 @@ class FileSystemEndeavor:
 
     story_source_attr_name = "storySource"
 
-    def __init__(self, max_stories: int, story_dir: StoryDir):
+    def __init__(self, max_stories: int, story_dir: StoryDir, doc_cache: StoryDocCache = None,
+                 story_docs: List[BlotterDocument] = None, endeavor_path: str = None):
+        """
+        :param story_docs: documents already loaded for story_dir.story_list, in the same order.
+            If not provided, each story file is loaded with load_and_resave_story_file_with_attribs()
+        :param endeavor_path: the Endeavors directory that storySource values are relative to, see
+            encode_story_source()
+        """
         self.max_stories = max_stories
         self.story_dir = story_dir
-        self.story_docs: List[BlotterDocument] = [load_and_resave_story_file_with_attribs(s_file)
-                                                  for s_file in self.story_dir.story_list]
+        if story_docs is None:
+            story_docs = [load_and_resave_story_file_with_attribs(s_file, doc_cache,
+                                                                  self.story_dir.get_file_stat(s_file),
+                                                                  endeavor_path)
+                          for s_file in self.story_dir.story_list]
+        self.story_docs: List[BlotterDocument] = story_docs
 
     def get_endeavor_name(self):
         return os.path.basename(self.story_dir.path)
@@ -109,22 +222,150 @@ class FileSystemEndeavor:
 
 
 
-def load_and_resave_story_file_with_attribs(file_name) -> BlotterDocument:
+class StoryWriteCounts:
+    """
+    Counts of story files that load_and_resave_story_file_with_attribs() wrote back to disk, and of files it skipped
+    because enriching them with attributes changed nothing.  Exposed for monitoring how much of the Endeavors tree
+    a run rewrites.
+    """
+
+    def __init__(self):
+        self.written = 0
+        self.skipped = 0
+        self.lock = threading.Lock()  # stories may be loaded from a thread pool
+
+    def count(self, written: bool):
+        with self.lock:
+            if written:
+                self.written += 1
+            else:
+                self.skipped += 1
+
+    def reset(self):
+        with self.lock:
+            self.written = 0
+            self.skipped = 0
+
+    def __str__(self):
+        return f"story files written: {self.written} skipped unchanged: {self.skipped}"
+
+
+story_write_counts = StoryWriteCounts()
+
+
+def load_and_resave_story_file_with_attribs(file_name, doc_cache: StoryDocCache = None,
+                                            file_stat: os.stat_result = None,
+                                            endeavor_path: str = None) -> BlotterDocument:
     """
     Loads a file system file as a BlotterDocument and saves it back to disk with the following enrichment:.
         Adds 'storyName:' to the BlotterDocument representing a Story.
             This enable the story to be migrated to an object store.
         adds 'storySource:' 'titleHash:' to each task item in the BlotterDocument
             These attributes enable items to be re titled and still update the original story file.
+    The file is only written if the enriched document text differs from what was read, so unchanged stories keep
+    their mtime and are not rehashed by git.  See story_write_counts.
+    If a doc_cache is given, a file that is unchanged since it was cached with the same story_enrich_settings() is
+    rehydrated from the cache instead of being parsed, and the enriched document is cached for the next run.
+    file_stat is the stat of file_name if already known from listing its directory, see StoryDir.get_file_stat()
+    endeavor_path is the Endeavors directory that storySource values are relative to, see encode_story_source()
+    """
+    file_text = journaldir.read_file_str(file_name)
+    if doc_cache:
+        cached_doc = doc_cache.get(file_name, file_text, file_stat, story_enrich_settings(endeavor_path))
+        if cached_doc:
+            story_write_counts.count(written=False)  # cached docs are already enriched
+            return cached_doc
+    return resave_story_text_with_attribs(file_name, file_text, doc_cache, endeavor_path)
+
+
+def resave_story_text_with_attribs(file_name, file_text, doc_cache: StoryDocCache = None,
+                                   endeavor_path: str = None) -> BlotterDocument:
+    """
+    The parse, enrich and write part of load_and_resave_story_file_with_attribs() for file_text already read
+    from file_name.  Counts the write in story_write_counts, and caches the result if a doc_cache is given.
     """
-    story_doc: BlotterDocument = load_doc_from_file(file_name)
-    story_doc.attribute_all_unresolved_items(FileSystemEndeavor.story_source_attr_name, file_name)
+    story_doc, story_text, written = enrich_story_text(file_name, file_text, endeavor_path)
+    story_write_counts.count(written)
+    if doc_cache:
+        doc_cache.put(file_name, story_text, story_doc, story_enrich_settings(endeavor_path))
+    return story_doc
+
+
+def story_enrich_settings(endeavor_path: str = None) -> list:
+    """
+    The settings that enrich_story_doc() output depends on besides the story text, for the StoryDocCache: a story
+    cached with other settings is enriched again, e.g. to rewrite its storySource values after
+    apCfg.relative_story_source changed.
+    """
+    return [apCfg.relative_story_source, os.path.abspath(endeavor_path or apCfg.endeavor_dir)]
+
+
+def enrich_story_text(file_name, file_text, endeavor_path: str = None) -> Tuple[BlotterDocument, str, bool]:
+    """
+    Parse file_text read from file_name, add the story attributes, and write the file only if that changed its text.
+    :return: (the enriched story document, its text, True if the file was written)
+    """
+    story_doc, story_text, changed = enrich_story_doc(file_name, file_text, endeavor_path)
+    if changed:
+        journaldir.write_filepath(story_text, file_name)
+    return story_doc, story_text, changed
+
+
+def enrich_story_doc(file_name, file_text, endeavor_path: str = None) -> Tuple[BlotterDocument, str, bool]:
+    """
+    The parse and enrich part of enrich_story_text(), without writing the file.
+    :return: (the enriched story document, its text, True if the text differs from file_text)
+    """
+    story_doc: BlotterDocument = BlotterDocument.fromtext(file_text)
+    story_doc.attribute_all_unresolved_items(FileSystemEndeavor.story_source_attr_name,
+                                             encode_story_source(file_name, endeavor_path=endeavor_path))
     story_doc.for_journal_sections_add_all_missing_item_title_hash()
     story_name = os.path.basename(file_name)
     story_name = re.sub(apCfg.story_suffix_pat, '', story_name)
     story_doc.story_name = story_name
-    journaldir.write_filepath(str(story_doc), file_name)
-    return story_doc
+    story_text = str(story_doc)
+    return story_doc, story_text, story_text != file_text
+
+
+def encode_story_source(file_name, relative: bool = None, endeavor_path: str = None) -> str:
+    """
+    The 'storySource:' value to write for the story file_name: file_name itself, or if relative
+    (default apCfg.relative_story_source) the shorter an_endeavor/story.md path under the Endeavors directory
+    endeavor_path (default apCfg.endeavor_dir).  A file that is not in an endeavor dir of endeavor_path keeps its
+    full path, since resolve_story_source() could not find it from an_endeavor/story.md.
+    """
+    if relative is None:
+        relative = apCfg.relative_story_source
+    if not relative:
+        return file_name
+    endeavor_dir, story_name = os.path.split(file_name)
+    if os.path.abspath(os.path.dirname(endeavor_dir)) != os.path.abspath(endeavor_path or apCfg.endeavor_dir):
+        return file_name
+    return os.path.join(os.path.basename(endeavor_dir), story_name)
+
+
+def resolve_story_source(story_source: str, endeavor_path: str = None) -> str:
+    """
+    :return: the story file path for a 'storySource:' value written by encode_story_source().
+        Values of the relative form an_endeavor/story.md are resolved against endeavor_path
+        (default apCfg.endeavor_dir).  Any other value is already a path.
+    """
+    endeavor_name, story_name = os.path.split(story_source)
+    if not endeavor_name or os.path.dirname(endeavor_name) or endeavor_name in (os.curdir, os.pardir):
+        return story_source
+    return os.path.join(endeavor_path or apCfg.endeavor_dir, story_source)
+
+
+def parse_story_text_for_transfer(file_name, file_text, endeavor_path: str = None) -> Tuple[list, str, bool]:
+    """
+    Worker process side of FileSystemDomain.load_story_files_in_processes().
+    Like enrich_story_doc(), but returns the document as BlotterDocument.as_encodable() so only plain lists and
+    strings are pickled back to the parent process.
+    The worker does not write the file: the parent does, so the write is in its journaldir.written_paths and
+    deferred_sync.
+    """
+    story_doc, story_text, changed = enrich_story_doc(file_name, file_text, endeavor_path)
+    return story_doc.as_encodable(), story_text, changed
 
 
 def load_doc_from_file(file_name) -> BlotterDocument:
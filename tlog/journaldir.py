@@ -3,10 +3,10 @@
 import sys
 
 # journaldir.py
-from typing import TextIO, List
+from typing import TextIO, List, TYPE_CHECKING
 
-from git import Repo
-from git import IndexFile
+if TYPE_CHECKING:
+    from git import IndexFile  # GitPython is imported when the journal repo is first used, see make_git_repo()
 
 """
 determine directory for journal files based on current year and month.
@@ -18,9 +18,14 @@ from tlconst import apCfg
 import datetime
 import os
 import re
+import stat
+import threading
 from os import listdir
+import json
 import logging
+from typing import Dict
 import tlutil
+from runstats import run_stats
 
 class UserPaths:
     """
@@ -53,18 +58,82 @@ class UserPaths:
         self.old_journal_dir = os.path.join(self.tmp_root, "old")
         self.sprint_log_file = os.path.join(self.tmp_root, "latestSprint.txt")
         self.debug_log_file = os.path.join(self.tmp_root, "tl.debug.log")
+        self.story_cache_file = os.path.join(self.tmp_root, "story_doc_cache.json")
+        self.journal_index_file = os.path.join(self.tmp_root, "journal_index.json")
+        self.run_stats_file = os.path.join(self.tmp_root, "tl.run_stats.jsonl")  # a runstats record per run
+        self.profile_file = os.path.join(self.tmp_root, "tl.profile.pstats")  # written by tlog.py --profile
 
 
     def git_init_journal(self):
         self.git_repo_obj = make_git_repo(self.journal_path)
 
-    def git_add_all(self, daily_o, message):
-        untracked = self.git_repo_obj.untracked_files
-        # commit_message = ",".join(untracked)[0:50]
-        commit_message = f"tlog commit: {message} " + daily_o.j_month_dir
-        journal_index: IndexFile = self.git_repo_obj.index
+    def git_add_all(self, commit_message):
+        """Stage everything in the journal and commit it.  git_commit_written() does this for a new journal repo."""
+        journal_index: 'IndexFile' = self.git_repo_obj.index
         self.git_repo_obj.git.add('--all')
         journal_index.commit(commit_message)
+        run_stats.count("git_commands", 2)
+
+    def git_commit_written(self, daily_o, message):
+        """
+        Commit the paths in the journal that tlog wrote, moved or removed since the last commit (see written_paths),
+        staging only those, so git does not refresh the index for the whole journal tree.
+        The first commit to a new journal repo stages everything, with git_add_all().
+        apCfg.git_commit_backend selects how the commit is made, see GitBackend.
+        """
+        commit_message = f"tlog commit: {message} " + daily_o.j_month_dir
+        if self.git_repo_obj is None:
+            self.git_init_journal()
+        git_cmd = self.git_repo_obj.git
+        if not self.git_repo_obj.head.is_valid():
+            written_paths.take()
+            self.git_add_all(commit_message)
+            return
+        journal_paths = self.journal_relative_paths(written_paths.take())
+        if apCfg.git_commit_backend == GitBackend.PLUMBING:
+            self.git_commit_tree(journal_paths, commit_message)
+            return
+        present_paths = [path for path in journal_paths if os.path.lexists(os.path.join(self.journal_path, path))]
+        removed_paths = [path for path in journal_paths if path not in present_paths]
+        if present_paths:
+            git_cmd.add('--all', '--', *present_paths)
+        if removed_paths:
+            git_cmd.rm('--cached', '--ignore-unmatch', '--quiet', '--', *removed_paths)
+        self.git_repo_obj.index.commit(commit_message)
+        run_stats.count("git_commands", 1 + bool(present_paths) + bool(removed_paths))
+
+    def git_commit_tree(self, journal_paths: List[str], commit_message: str) -> str:
+        """
+        Commit journal_paths on top of HEAD with git plumbing: update-index adds, updates or removes just those
+        index entries, then write-tree, commit-tree and update-ref make the commit, so neither the work tree nor
+        the rest of the index is examined.
+        :return: the new commit's hexsha
+        """
+        from git import Actor
+        git_cmd = self.git_repo_obj.git
+        if journal_paths:
+            git_cmd.update_index('--add', '--remove', '--', *journal_paths)
+        tree_sha = git_cmd.write_tree()
+        parent_sha = self.git_repo_obj.head.commit.hexsha
+        config_reader = self.git_repo_obj.config_reader()
+        author = Actor.author(config_reader)
+        committer = Actor.committer(config_reader)
+        identity_env = {"GIT_AUTHOR_NAME": author.name, "GIT_AUTHOR_EMAIL": author.email,
+                        "GIT_COMMITTER_NAME": committer.name, "GIT_COMMITTER_EMAIL": committer.email}
+        commit_sha = git_cmd.commit_tree(tree_sha, '-p', parent_sha, '-m', commit_message, env=identity_env)
+        git_cmd.update_ref('-m', f"commit: {commit_message}", 'HEAD', commit_sha, parent_sha)
+        run_stats.count("git_commands", 4 + bool(journal_paths))
+        return commit_sha
+
+    def journal_relative_paths(self, paths: List[str]) -> List[str]:
+        """:return: the paths that are in the journal, relative to journal_path"""
+        journal_real_path = os.path.realpath(self.journal_path)
+        relative_paths = []
+        for path in paths:
+            relative_path = os.path.relpath(os.path.realpath(path), journal_real_path)
+            if relative_path != os.curdir and relative_path.split(os.sep)[0] != os.pardir:
+                relative_paths.append(relative_path)
+        return relative_paths
 
     def __str__(self):
         return "\n".join(["JournalPath: " + self.journal_path,
@@ -79,16 +148,30 @@ def get_file_names_by_pattern(source_dir_name, a_pattern: re.Pattern) -> List[st
 	Get the file names in a directory that match a compiled regex 
 	pattern that are not themselves directories.
 	"""
-    matching_file_list: List[str] = []
-    if not os.path.isdir(source_dir_name):
-        return matching_file_list
+    return [entry.path for entry in scan_dir_files(source_dir_name, [a_pattern])[0]]
 
-    for f in sorted(listdir(source_dir_name)):
-        fqp = os.path.join(source_dir_name, f)
-        if os.path.isfile(fqp):
-                if a_pattern.match(f):
-                    matching_file_list.append(fqp)
-    return matching_file_list
+
+def scan_dir_files(source_dir_name, patterns: List[re.Pattern]) -> List[List[os.DirEntry]]:
+    """
+    Classify the files in a directory by several compiled regex patterns with one os.scandir() pass.
+    The os.DirEntry objects returned give the path and name without further system calls, is_file() usually
+    needs no stat, and stat() is cached by the entry, so file metadata such as st_mtime_ns and st_size can be
+    passed on to change detection (see StoryDir.get_file_stat()) rather than statting the file again.
+    :return: for each pattern, the DirEntry of each file (not directory) whose name matches it, sorted by name.
+        A missing source_dir_name has no files.
+    """
+    matching_entries: List[List[os.DirEntry]] = [[] for _ in patterns]
+    try:
+        with os.scandir(source_dir_name) as dir_entries:
+            for entry in dir_entries:
+                for pattern, pattern_entries in zip(patterns, matching_entries):
+                    if pattern.match(entry.name) and entry.is_file():
+                        pattern_entries.append(entry)
+    except (FileNotFoundError, NotADirectoryError):
+        return matching_entries
+    for pattern_entries in matching_entries:
+        pattern_entries.sort(key=lambda entry: entry.name)
+    return matching_entries
 
 
 # todo add a test
@@ -106,6 +189,8 @@ def move_files(target_dir_path, file_paths: List[str]):
     for file_path in file_paths:
         dest_file_path = os.path.join(target_dir_path, os.path.basename(file_path))
         os.replace(file_path, dest_file_path)
+        written_paths.add(file_path, dest_file_path)
+        run_stats.count("files_moved")
 
 
 
@@ -173,20 +258,140 @@ def read_file_str(filepath) -> str:
     if os.path.isfile(filepath):
         with open(filepath, 'r') as data_file:
             data = data_file.read()
+        run_stats.count("files_read")
+        run_stats.count("chars_read", len(data))
     return str(data)
 
-def write_filepath(new_content, filepath):
+def write_filepath(new_content, filepath, fsync: str = None):
+    """
+    Write new_content to filepath with write_file_atomic(), making the directory if needed.
+    """
     base_dir: str = os.path.dirname(filepath)
-    if not os.path.exists(base_dir):
-        os.makedirs(base_dir)
+    if base_dir and not os.path.exists(base_dir):
+        os.makedirs(base_dir, exist_ok=True)
+    write_file_atomic(new_content, filepath, fsync)
+
+
+class GitBackend:
+    """How UserPaths.git_commit_written() commits (apCfg.git_commit_backend)"""
+    PORCELAIN = "porcelain"  # git add / git rm of the written paths, then GitPython's IndexFile.commit()
+    PLUMBING = "plumbing"  # git update-index, write-tree, commit-tree and update-ref, see git_commit_tree()
+
+
+class FsyncMode:
+    """When write_file_atomic() forces written data to disk (apCfg.write_fsync)"""
+    FILE = "file"  # before each file replaces the old one
+    END_OF_RUN = "end"  # once for all files written, when deferred_sync.sync() is called at the end of the run
+    NONE = "none"  # left to the operating system
+
+
+class DeferredSync:
+    """
+    Files written by write_file_atomic() with FsyncMode.END_OF_RUN, to be fsynced together, along with their
+    directories, by sync().
+    """
+
+    def __init__(self):
+        self.paths: List[str] = []
+        self.lock = threading.Lock()  # stories may be written from a thread pool
+
+    def add(self, filepath):
+        with self.lock:
+            self.paths.append(filepath)
+
+    def sync(self):
+        with self.lock:
+            paths, self.paths = self.paths, []
+        for path in dict.fromkeys(paths):
+            fsync_path(path)
+        for dir_path in dict.fromkeys(os.path.dirname(path) or "." for path in paths):
+            fsync_path(dir_path)
+        return len(paths)
+
+
+deferred_sync = DeferredSync()
+
+
+class WrittenPaths:
+    """
+    The paths written, moved or removed by this module during a run, so UserPaths.git_commit_written() stages
+    only those instead of the whole journal.
+    """
+
+    def __init__(self):
+        self.paths = set()
+        self.lock = threading.Lock()  # stories may be written from a thread pool
+
+    def add(self, *paths):
+        with self.lock:
+            self.paths.update(paths)
+
+    def take(self) -> List[str]:
+        """:return: the paths recorded since the last take(), sorted, and forget them"""
+        with self.lock:
+            paths, self.paths = self.paths, set()
+        return sorted(paths)
+
 
-    new_fd: TextIO
-    with open(filepath, "w") as new_fd:
-        new_fd.write(new_content)
+written_paths = WrittenPaths()
+
+
+def fsync_path(path):
+    """fsync a file or directory.  Platforms that can not open a directory for fsync are ignored."""
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def write_file_atomic(new_content, filepath, fsync: str = None):
+    """
+    Write new_content to a temporary file in the directory of filepath, then os.replace() filepath with it,
+    so filepath always holds either its old or its new content, never a partial write.
+    The new file keeps the permissions of the file it replaces.
+    :param new_content: a str, or an object with a write_to(fp) method such as a BlotterDocument
+    :param fsync: a FsyncMode value, default apCfg.write_fsync
+    """
+    fsync = fsync or apCfg.write_fsync
+    dir_name, base_name = os.path.split(filepath)
+    tmp_path = os.path.join(dir_name, f".{base_name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        new_fd: TextIO
+        with open(tmp_path, "w") as new_fd:
+            if isinstance(new_content, str):
+                new_fd.write(new_content)
+            else:
+                new_content.write_to(new_fd)
+            bytes_written = new_fd.tell()
+            if fsync == FsyncMode.FILE:
+                new_fd.flush()
+                os.fsync(new_fd.fileno())
+        if os.path.exists(filepath):
+            os.chmod(tmp_path, stat.S_IMODE(os.stat(filepath).st_mode))
+        os.replace(tmp_path, filepath)
+        written_paths.add(filepath)
+        run_stats.count("files_written")
+        run_stats.count("bytes_written", bytes_written)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    if fsync == FsyncMode.FILE:
+        fsync_path(dir_name or ".")
+    elif fsync == FsyncMode.END_OF_RUN:
+        deferred_sync.add(filepath)
 
 def remove_filepath(filepath: str):
     if os.path.exists(filepath):
         os.remove(filepath)
+        written_paths.add(filepath)
+        run_stats.count("files_removed")
 
 def write_dir_file(new_content, dir_name, doc_name):
     filepath = os.path.join(dir_name, doc_name)
@@ -195,16 +400,13 @@ def write_dir_file(new_content, dir_name, doc_name):
         if previous_content == new_content:
             print(f"new content same as old. Nothing written. {doc_name}")
         else:
-            jfd = open(filepath, "w")
-            jfd.write(new_content)
-            jfd.close
+            write_file_atomic(new_content, filepath)
     else:
-        jfd = open(filepath, "w")
-        jfd.write(new_content)
-        jfd.close
+        write_file_atomic(new_content, filepath)
 
 
 def make_git_repo(path):
+    from git import Repo  # GitPython is slow to import, and only needed for runs that commit
     new_rw_repo = Repo.init(path)
     # new_rw_repo.config_reader()  # get a config reader for read-only access
     with new_rw_repo.config_writer():  # get a config writer to change configuration
@@ -244,6 +446,163 @@ def get_prior_dir(search_dir):
     return os.path.join(base_path, year_str, mm)
 
 
+class JournalIndex:
+    """
+    Persistent index of the journal month directories, journal_root/yyyy/mm, that hold story or blotter files,
+    so the latest journal dir can be found with a lookup instead of scanning back one month at a time:
+        { "journal_root": path, "months": { "yyyy/mm": {"stories": [file names], "blotters": [file names]} },
+          "empty_months": { "yyyy/mm": mtime ns } }
+    Month dirs with neither, e.g. with only resolved or notes files, or left empty by an aborted run, are kept in
+    empty_months with their mtime, so they are not listed again until a file is added to or removed from them.
+    The index is rebuilt from the journal dirs if its file is missing, unreadable or for another journal_root.
+    tlog keeps it current by calling index_month_dir() for a month dir after writing or moving files in it.
+    """
+
+    stories_key = "stories"
+    blotters_key = "blotters"
+    year_pat = re.compile("^[0-9]{4}$")
+    month_pat = re.compile("^[01][0-9]$")
+
+    def __init__(self, journal_root, index_file):
+        self.journal_root = journal_root
+        self.index_file = index_file
+        self.months: Dict[str, Dict[str, List[str]]] = {}
+        self.empty_months: Dict[str, int] = {}
+        if not self.load():
+            self.rebuild()
+
+    def load(self) -> bool:
+        """:return: True if index_file held an index of journal_root"""
+        if not os.path.isfile(self.index_file):
+            return False
+        try:
+            with open(self.index_file, 'r') as index_fd:
+                index_data = json.load(index_fd)
+        except (OSError, ValueError) as e:
+            logging.getLogger('debuglog').warning(f"ignoring unreadable journal index {self.index_file}: {e}")
+            return False
+        if index_data.get("journal_root") != self.journal_root:
+            return False
+        self.months = index_data.get("months", {})
+        self.empty_months = index_data.get("empty_months", {})
+        return True
+
+    def save(self):
+        write_filepath(json.dumps({"journal_root": self.journal_root, "months": self.months,
+                                   "empty_months": self.empty_months}, indent=1),
+                       self.index_file, FsyncMode.NONE)  # can be rebuilt, so not worth an fsync
+
+    def rebuild(self):
+        """Index every journal_root/yyyy/mm directory"""
+        self.months = {}
+        self.empty_months = {}
+        if not os.path.isdir(self.journal_root):
+            return
+        for year in sorted(listdir(self.journal_root)):
+            year_dir = os.path.join(self.journal_root, year)
+            if JournalIndex.year_pat.match(year) and os.path.isdir(year_dir):
+                for month in sorted(listdir(year_dir)):
+                    if JournalIndex.month_pat.match(month):
+                        self.index_month_dir(os.path.join(year_dir, month))
+
+    def month_key(self, month_dir):
+        """:return: "yyyy/mm" for a journal_root/yyyy/mm month_dir, or None if month_dir is not one."""
+        rel_dir = os.path.relpath(month_dir, self.journal_root)
+        parts = rel_dir.split(os.sep)
+        if len(parts) != 2 or not JournalIndex.year_pat.match(parts[0]) or not JournalIndex.month_pat.match(parts[1]):
+            return None
+        return "/".join(parts)
+
+    def index_month_dir(self, month_dir):
+        """
+        List month_dir and record its story and blotter files.  A month with neither is dropped from the index's
+        months, and kept in empty_months if month_dir exists.
+        :return: (story file paths, blotter file paths)
+        """
+        story_entries, blotter_entries = scan_dir_files(month_dir, [apCfg.story_pat, apCfg.blotter_pat])
+        story_files = [entry.path for entry in story_entries]
+        blotter_files = [entry.path for entry in blotter_entries]
+        key = self.month_key(month_dir)
+        if key:
+            if story_files or blotter_files:
+                self.months[key] = {JournalIndex.stories_key: [os.path.basename(f) for f in story_files],
+                                    JournalIndex.blotters_key: [os.path.basename(f) for f in blotter_files]}
+                self.empty_months.pop(key, None)
+            else:
+                self.months.pop(key, None)
+                month_mtime = JournalIndex.dir_mtime(month_dir)
+                if month_mtime is None:
+                    self.empty_months.pop(key, None)
+                else:
+                    self.empty_months[key] = month_mtime
+        return story_files, blotter_files
+
+    @staticmethod
+    def dir_mtime(dir_path):
+        """:return: the st_mtime_ns of dir_path, or None if it does not exist"""
+        try:
+            return os.stat(dir_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def find_latest_month_dir(self, latest_dir, history_months):
+        """
+        Find the most recent month dir, from latest_dir back through history_months months, that has story or
+        blotter files.  The index picks the month, which is then listed to confirm it.  A month that no longer
+        has files is dropped from the index and the next most recent is tried.
+        If a month dir with files turns up between the month picked and latest_dir, it was made outside of tlog
+        (synced from another machine, copied or restored), so the index is rebuilt and the search repeated.
+        :return: (month dir, story file paths, blotter file paths), or None if there is no such month dir, or
+            latest_dir is not a month dir under journal_root.
+        """
+        latest_key = self.month_key(latest_dir)
+        if not latest_key or history_months < 1:
+            return None
+        latest_year, latest_month = (int(part) for part in latest_key.split("/"))
+        first_month_number = latest_year * 12 + latest_month - history_months
+        candidate_keys = [key for key in self.months
+                          if first_month_number < JournalIndex.month_number(key) and key < latest_key]
+        older_key = None
+        for key in [latest_key] + sorted(candidate_keys, reverse=True):
+            month_dir = os.path.join(self.journal_root, *key.split("/"))
+            story_files, blotter_files = self.index_month_dir(month_dir)
+            if story_files or blotter_files:
+                if key != latest_key and self.has_unindexed_month(key, older_key or latest_key):
+                    logging.getLogger('debuglog').warning(
+                        f"rebuilding journal index {self.index_file}: a month dir newer than {key} is not in it")
+                    self.rebuild()
+                    return self.find_latest_month_dir(latest_dir, history_months)
+                return month_dir, story_files, blotter_files
+            older_key = key
+        return None
+
+    @staticmethod
+    def month_number(key):
+        """:return: year * 12 + month for a "yyyy/mm" key"""
+        return int(key[0:4]) * 12 + int(key[5:7])
+
+    def has_unindexed_month(self, older_key, newer_key) -> bool:
+        """
+        :return: True if a month dir strictly between the "yyyy/mm" keys older_key and newer_key has story or
+            blotter files but is not in the index.  Only existing year and month dirs are listed, and months in
+            empty_months only if their mtime changed.
+        """
+        for month_number in range(JournalIndex.month_number(older_key) + 1, JournalIndex.month_number(newer_key)):
+            year, month = divmod(month_number - 1, 12)
+            key = f"{year:04d}/{month + 1:02d}"
+            if key in self.months:
+                continue
+            month_dir = os.path.join(self.journal_root, *key.split("/"))
+            if key in self.empty_months:
+                if self.empty_months[key] == JournalIndex.dir_mtime(month_dir):
+                    continue
+            elif not os.path.isdir(os.path.join(self.journal_root, f"{year:04d}")) or not os.path.isdir(month_dir):
+                continue
+            if any(self.index_month_dir(month_dir)):
+                return True
+        return False
+
+
 # class Endeavor_deprecated:
 #     def __init__(self, name, a_user_path_obj):
 #         self.name = name
@@ -259,6 +618,7 @@ class StoryDir:
     StoryDir objects have
      - a self.path, which is a directory
      - a list of file paths to the story files in that directory.
+     - the os.DirEntry of each story file found by listing the directory, by path.
     The list of file paths is orders according to prioritized.md, followed by any unprioritized stories.
     """
     def __init__(self, sdir):
@@ -269,32 +629,64 @@ class StoryDir:
         debuglog = logging.getLogger('debuglog')
         self.path = sdir
         self.story_list = []
+        self.story_entries: Dict[str, os.DirEntry] = {}
         if os.path.isdir(sdir):
-            dir_story_list = get_file_names_by_pattern(sdir, apCfg.story_pat)
-            prioritized_file_list: str = get_file_names_by_pattern(sdir, apCfg.priority_pat)
-            if prioritized_file_list:
-                pri_file = prioritized_file_list[0]
-                pri_order_text = read_file_str(pri_file) # take first if more than 1 pri file.
-                pri_order_stories = pri_order_text.split("\n")
-                for story_file in pri_order_stories: # add story files with listed priorities
-                    story_file.strip()
-                    if story_file != '':
-                        full_story_path: str = os.path.join(sdir, story_file)
-                        if os.path.isfile(full_story_path):
-                            self.story_list.append(full_story_path)
-                        else:
-                            debuglog.warning(f"{story_file} is in {pri_file}, but not found in {sdir}")
+            story_entries, priority_entries = scan_dir_files(sdir, [apCfg.story_pat, apCfg.priority_pat])
+            self.story_entries = {entry.path: entry for entry in story_entries}
+            dir_story_list = [entry.path for entry in story_entries]
+            if priority_entries:
+                pri_entry = priority_entries[0]  # take first if more than 1 pri file.
+                for story_file in priority_order_cache.get_order(pri_entry): # add story files with listed priorities
+                    full_story_path: str = os.path.join(sdir, story_file)
+                    if full_story_path in self.story_entries or os.path.isfile(full_story_path):
+                        self.story_list.append(full_story_path)
+                    else:
+                        debuglog.warning(f"{story_file} is in {pri_entry.path}, but not found in {sdir}")
+            prioritized_stories = set(self.story_list)
             for story_file in dir_story_list: # add the dir stories not in pri_file
-                if story_file not in self.story_list:
+                if story_file not in prioritized_stories:
                     self.story_list.append(story_file)
         else:
             raise tlutil.TaskSourceException(f"{sdir} is not a directory, so can not be a StoryDir")
 
+    def get_file_stat(self, story_file) -> os.stat_result:
+        """:return: the stat of story_file from the directory listing, or None if it was not listed"""
+        entry = self.story_entries.get(story_file)
+        return entry.stat() if entry else None
+
 
     def __str__(self):
         return "StoryDir:({}):".format(self.path) + ",".join(self.story_list)
 
 
+class PriorityOrderCache:
+    """
+    The story file names listed in each prioritized.md, by path, kept until the file's mtime or size changes,
+    so constructing a StoryDir again does not re-read an unchanged prioritized.md.
+    The cache is not persisted, so it only helps a process that lists the same endeavor more than once, such as one
+    loading a FileSystemDomain repeatedly.  A tlog.py run constructs each endeavor's StoryDir once.
+    """
+
+    def clear(self):
+        self.orders = {}
+
+    def __init__(self):
+        self.orders: Dict[str, tuple] = {}  # path -> (st_mtime_ns, st_size, [story file names])
+
+    def get_order(self, pri_entry: os.DirEntry) -> List[str]:
+        """:return: the non empty lines of the prioritized file pri_entry, in order"""
+        pri_stat = pri_entry.stat()
+        cached = self.orders.get(pri_entry.path)
+        if cached and cached[0] == pri_stat.st_mtime_ns and cached[1] == pri_stat.st_size:
+            return cached[2]
+        order = [story_file for story_file in read_file_str(pri_entry.path).split("\n") if story_file != '']
+        self.orders[pri_entry.path] = (pri_stat.st_mtime_ns, pri_stat.st_size, order)
+        return order
+
+
+priority_order_cache = PriorityOrderCache()
+
+
 if __name__ == "__main__":
     user_path_o: UserPaths = UserPaths()
     print(user_path_o.journal_path)
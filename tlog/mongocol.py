@@ -1,13 +1,19 @@
-from pymongo import MongoClient
-
 # mongdb Endeavor collection module
 
 import pprint
 from endeavor import Endeavor
-def upsert_endeavor(an_endeavor: Endeavor):
+
+
+def endeavor_collection():
+    """:return: the endeavors collection.  pymongo is imported here, so importing this module does not need it"""
+    from pymongo import MongoClient
     client = MongoClient('localhost', 27017)
     db = client['tlog']         # tlog is the db
-    endeavors = db['endeavors'] # endeavors is the collection
+    return db['endeavors']      # endeavors is the collection
+
+
+def upsert_endeavor(an_endeavor: Endeavor):
+    endeavors = endeavor_collection()
 
     # endeavor_id = endeavors.insert_one(an_endeavor.as_encodable()).inserted_id
     endeavor_id = endeavors.update_one(
@@ -17,15 +23,14 @@ def upsert_endeavor(an_endeavor: Endeavor):
     print(f"Mongo! endeavor _id: {endeavor_id} inserted into {endeavors}")
 
 def list_endeavors():
-    client = MongoClient('localhost', 27017)
-    db = client['tlog']         # tlog is the db
-    endeavors = db['endeavors'] # endeavors is the collection
+    endeavors = endeavor_collection()
     for endeavor in endeavors.find():
         pprint.pprint(endeavor)
 
 
 
 if __name__ == '__main__':
+    from pymongo import MongoClient
     #client = MongoClient();
     client = MongoClient('localhost', 27017)
     db = client['tlog'] # tlog is the db
@@ -0,0 +1,65 @@
+"""
+Phase timings and counters for a tlog run.
+
+tlog.main() marks the start of each step of its pipeline with run_stats.phase(), and the file, parse and git code
+counts what it does with run_stats.count().  At the end of the run the record is appended, as one line of JSON, to
+UserPaths.run_stats_file.
+"""
+import datetime
+import json
+import threading
+import time
+from typing import Dict, List
+
+
+class RunStats:
+    """
+    Wall and CPU time of the named phases of a run, in the order they ran, and counters such as files_read or
+    items_parsed.  count() may be called from the story loading thread pool.
+    Work done in parse worker processes (apCfg.parse_processes) is timed in its phase but not counted.
+    """
+
+    def __init__(self):
+        self.started = datetime.datetime.now().isoformat(timespec="seconds")
+        self.phases: List[dict] = []
+        self.counters: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.phase_name = None
+        self.phase_wall_start = 0.0
+        self.phase_cpu_start = 0.0
+
+    def phase(self, name: str):
+        """End the current phase, if any, and start timing the phase called name"""
+        self.end_phase()
+        self.phase_name = name
+        self.phase_wall_start = time.perf_counter()
+        self.phase_cpu_start = time.process_time()
+
+    def end_phase(self):
+        if self.phase_name is None:
+            return
+        self.phases.append({"name": self.phase_name,
+                            "wall_s": round(time.perf_counter() - self.phase_wall_start, 6),
+                            "cpu_s": round(time.process_time() - self.phase_cpu_start, 6)})
+        self.phase_name = None
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def as_encodable(self) -> dict:
+        """The run record, ending the current phase"""
+        self.end_phase()
+        return {"started": self.started,
+                "wall_s": round(sum(phase["wall_s"] for phase in self.phases), 6),
+                "cpu_s": round(sum(phase["cpu_s"] for phase in self.phases), 6),
+                "phases": self.phases,
+                "counters": dict(sorted(self.counters.items()))}
+
+    def append_to(self, file_path: str):
+        """Append the run record to file_path as a line of JSON"""
+        with open(file_path, "a") as stats_fd:
+            stats_fd.write(json.dumps(self.as_encodable()) + "\n")
+
+
+run_stats = RunStats()
@@ -20,6 +20,15 @@ class apCfg:
     endeavor_dir = convention_journal_root + endeavor_path_stub
 
     look_back_months = 24   # months of history to search for old task files.
+    load_workers = int(os.getenv('TLOG_LOAD_WORKERS', 1))  # threads for loading endeavors. 1 is sequential.
+    parse_processes = int(os.getenv('TLOG_PARSE_PROCESSES', 0))  # processes for parsing stories. 0 is in-process.
+    parse_process_min_chars = int(os.getenv('TLOG_PARSE_PROCESS_MIN_CHARS', 1000000))  # less story text than this
+                                                                                      # is parsed in-process.
+    git_commits_per_run = int(os.getenv('TLOG_GIT_COMMITS', 1))  # 2 also commits after updating stories, 0 none
+    git_commit_backend = os.getenv('TLOG_GIT_BACKEND', "porcelain")  # or plumbing.  See journaldir.GitBackend
+    write_fsync = os.getenv('TLOG_WRITE_FSYNC', "file")  # file, end (of run) or none.  See journaldir.FsyncMode
+    relative_story_source = bool(int(os.getenv('TLOG_RELATIVE_STORY_SOURCE', 0)))  # write storySource as
+                                                                                   # an_endeavor/story.md
 
     blotter_pat = re.compile(
         '[Bb]lotter-[0-9][0-9][0-9][0-9]-[01][0-9]-[0-3][0-9].md')
@@ -30,9 +30,11 @@ Logic for building TLDocuments line by line from text: (needs update)
 
 import re
 from collections import namedtuple
-from typing import List, Dict, Pattern
+from typing import List, Dict, Pattern, Tuple
 
-from docsec import Section, SectionSortDoc, Item, ItemAttribute
+from docsec import Section, SectionSortDoc, Item, ItemAttribute, LeaderDispatchPattern, LineKind, LineToken, \
+    tokenize_line, tokenize_lines
+from runstats import run_stats
 
 blank_ln_pat = re.compile("^\s*$")
 
@@ -63,14 +65,14 @@ default_maxTasks = 1  # used if not specified in a story.txt
 # --------
 
 # Define the Status type fields.
-Status = namedtuple('Status', ['name', 'val', 'pat_str', 'pattern'])
+Status = namedtuple('Status', ['name', 'val', 'pat_str', 'pattern', 'leader_chars'])
 
-def add_status(sd: Dict[str, Status], name, val, pat_str):
+def add_status(sd: Dict[str, Status], name, val, pat_str, leader_chars):
     """
     Creates a side affect of updating the dict sd with a Status created using the args configured in
     fill_status_dict().   This function also compiles a pattern to store in the Status object
     """
-    sd[name] = Status(name, val, pat_str, re.compile(pat_str))
+    sd[name] = Status(name, val, pat_str, re.compile(pat_str), leader_chars)
 
 def print_statuses(sd: Dict[str, Status]):
     for status_key in sd.keys():
@@ -83,13 +85,13 @@ def fill_status_dict(sd):
     add_status() is called for each configured status to load the sd dictionary
     """
     for status_record in [
-                            # name, val, pat_str, pattern
-                            ('abandoned', 'a', "^[aA] *-"),
-                            ('completed', 'x', "^[xX] *-"),
-                            ('scheduled', 's', "^[sS] *-"),
-                            ('in_progress', '/', r'^[\/\\] *-'),  # used here in head_str and not_do_str
-                            ('unfinished', 'u', "^[uU] *-"),
-                            ('do', 'd', "^[dD] *-") # Good usage in Document to configure the scrum Docstruct
+                            # name, val, pat_str, leader_chars (the first characters pat_str can match)
+                            ('abandoned', 'a', "^[aA] *-", 'aA'),
+                            ('completed', 'x', "^[xX] *-", 'xX'),
+                            ('scheduled', 's', "^[sS] *-", 'sS'),
+                            ('in_progress', '/', r'^[\/\\] *-', '/\\'),  # used here in head_str and not_do_str
+                            ('unfinished', 'u', "^[uU] *-", 'uU'),
+                            ('do', 'd', "^[dD] *-", 'dD') # Good usage in Document to configure the scrum Docstruct
                                                     # used here as part of head_str
                                                     # Good usages in BlotterDocument to make scrum and add_line()
                         ]:
@@ -132,15 +134,27 @@ title_group_str = r"\s*(.*\S)\s*$"  # only used here
 
 # this pattern used 2 regex match groups to parse lines as task Items
 # composed of a leader at the beginning of the line, and some text as the title.
-top_parser_pat = re.compile(leader_group_str + title_group_str)
+# top_parser_pat dispatches on the first character to the one status pattern that can match, and is equivalent to
+# re.compile(leader_group_str + title_group_str)
+top_parser_pat = LeaderDispatchPattern(title_group_str)
+for task_status_object in task_status_objects:
+    top_parser_pat.add_leader(task_status_object.leader_chars, task_status_object.pattern, task_status_object)
+
+
+def classify_task_line(data):
+    """
+    Return (Status, leader, title) for a task line, or None if data is not a task line.
+    The status is found by the first character of data, so the line is matched against a single pattern.
+    """
+    return top_parser_pat.classify(data)
 
 
 def find_status_name(leader_str):
-    for task_status_object in task_status_objects:
-        # print(f"{task_status_object}")
-        if task_status_object.pattern.match(leader_str):
-            # print(f"{leader_str} matches {task_status_object.name} ({task_status_object.val})")
-            return task_status_object.name
+    if not leader_str:
+        return None
+    leader_match = top_parser_pat.match_leader(leader_str)
+    if leader_match:
+        return leader_match[1].name
     return None
 
 # --------
@@ -225,6 +239,11 @@ class BlotterDocument:
 
         self.current_section = None
         self.last_data_section_add = None
+        # document item index, built by the first lookup, see build_item_index()
+        self.items_by_saved_hash: Dict[str, List[Tuple[Section, Item]]] = None
+        self.items_by_title: Dict[str, List[Tuple[Section, Item]]] = None
+        self.section_order: Dict[int, int] = None  # id(Section) -> a number increasing in journal order
+        self.sections_by_header: Dict[str, List[Section]] = None  # built by the first lookup by header
 
         self.add_section_from_line(None)  # make sure there is a sec at journal[0]
 
@@ -294,23 +313,32 @@ class BlotterDocument:
             self
             r_lines	raw lines
         """
-        prev_line_blank = False
-
         if not r_lines:
             return
 
-        for line in r_lines:
-            if blank_ln_pat.match(line):
+        self.add_tokens(tokenize_lines(r_lines, top_parser_pat))
+
+    def add_tokens(self, tokens):
+        """
+        Build the document from LineTokens made by docsec.tokenize_lines(), so each line is classified once.
+        Consecutive blank lines are collapsed to one.
+        """
+        prev_line_blank = False
+        line_count = 0
+        task_count = 0
+        for token in tokens:
+            line_count += 1
+            if token.kind == LineKind.BLANK:
                 if prev_line_blank:
                     continue
                 prev_line_blank = True
             else:
                 prev_line_blank = False
-
-            data = line.rstrip("\n")
-            # print("add_lines data:" + data)
-            self.add_document_line(data)
-            # self.add_line_deprecated(data)
+                if token.kind == LineKind.TASK:
+                    task_count += 1
+            self.add_document_token(token)
+        run_stats.count("lines_classified", line_count)  # each by the heading, leader and attribute patterns
+        run_stats.count("items_parsed", task_count)
 
     def add_document_line(self, data):
         """
@@ -323,6 +351,12 @@ class BlotterDocument:
 
         if data is None:
             return
+        self.add_document_token(tokenize_line(data, top_parser_pat))
+
+    def add_document_token(self, token: LineToken):
+        """
+        add_document_line() for a line that has already been classified by docsec.tokenize_line()
+        """
         # todo: self.add_attribute_data(data) # adds the data as an attribute if it is an attribute line.
         #  return true if it was added.
         #   if journal has only 1 section and it is empty or is an attribute section (is_doc_attrib_receptive())
@@ -334,32 +368,31 @@ class BlotterDocument:
         #   else nothing.  handle the line as below.  (even if it is an atribute, it is not a Documet attribute.
         #       It belongs bwlow a section.
         if self.is_doc_attrib_receptive():
-            might_be_attrib = ItemAttribute.fromline(data)
-            if might_be_attrib is not None:
-                self.set_doc_attrib(might_be_attrib.name, might_be_attrib.value)
+            if token.kind == LineKind.ATTRIBUTE:
+                self.set_doc_attrib(token.attrib.name, token.attrib.value)
                 return  #the data was added as a documet attribute.  no more work to do.
-                # todo set flag indicating the data was added
             else:
                 if self.journal[0].is_attrib_section():
                     # closeout is_doc_attrib_receptive() state by adding a second section
                     # for this data, which is not an attribute
                     self.add_section_from_line(None)
-        # todo test flag if data was added.
-        if Section.head_pat.match(data):
+        if token.kind == LineKind.HEADING:
             if self.current_section.is_empty():
                 # Putting a header on initial section
-                self.current_section.add_section_line(data)
+                self.current_section.add_section_token(token)
                 self.last_data_section_add = self.current_section
             else:
                 # New section.
-                self.add_section_from_line(data)
+                self.add_section_from_line(None)
+                self.current_section.add_section_token(token)
+            self.sections_by_header = None  # a header changed, so rebuild on the next lookup
 
-        elif top_parser_pat.match(data):
+        elif token.kind == LineKind.TASK:
             # todo: should not call this if the last_data_section_add was an attribute section.
-            self.current_section.add_section_line(data)
+            self.current_section.add_section_token(token)
             self.last_data_section_add = self.current_section
         else:
-            self.last_data_section_add.add_section_line(data)
+            self.last_data_section_add.add_section_token(token)
 
 
 
@@ -370,9 +403,85 @@ class BlotterDocument:
         """
         self.current_section = Section(top_parser_pat, data)
         self.journal.append(self.current_section)
+        self._index_new_section(head=False)
         self.last_data_section_add = self.current_section
         return self.current_section
 
+    def build_item_index(self):
+        """
+        Index the Items of all journal Sections by saved 'titleHash:' attribute and by title, following the
+        Section.find_item() rules, to the (Section, Item) pairs having them.
+        Each Section's own index tells self of later changes through add_index_keys() and remove_index_keys().
+        section_order numbers the Sections in journal order the way Section.item_order numbers Items.
+        """
+        if self.items_by_title is not None:
+            return
+        self.items_by_saved_hash, self.items_by_title = {}, {}
+        self.section_order = {}
+        for order, section in enumerate(self.journal):
+            self._index_section(section, order)
+
+    def _index_new_section(self, head: bool):
+        """Index the Section just inserted at the head of the journal, or appended to it"""
+        section = self.journal[0] if head else self.journal[-1]
+        order = None
+        if self.section_order is not None:
+            neighbour, offset = (self.journal[1], -1) if head else (self.journal[-2], 1)
+            order = self.section_order[id(neighbour)] + offset
+        self._index_section(section, order)
+
+    def _index_section(self, section: Section, order: int):
+        if self.sections_by_header is not None:
+            self.sections_by_header.setdefault(section.header, []).append(section)
+        if self.items_by_title is None:
+            return
+        self.section_order[id(section)] = order
+        section.build_item_index()
+        section.index_owner = self
+        for item in section.body_items:
+            self.add_index_keys(section, item, item.get_index_keys())
+
+    def add_index_keys(self, section: Section, item: Item, keys):
+        saved_hash, title, top = keys
+        if saved_hash:
+            self.items_by_saved_hash.setdefault(saved_hash, []).append((section, item))
+        else:
+            self.items_by_title.setdefault(title, []).append((section, item))
+
+    def remove_index_keys(self, section: Section, item: Item, keys):
+        saved_hash, title, top = keys
+        index, key = (self.items_by_saved_hash, saved_hash) if saved_hash else (self.items_by_title, title)
+        located_items = index.get(key)
+        if located_items:
+            for i, (located_section, located_item) in enumerate(located_items):
+                if located_section is section and located_item is item:
+                    del located_items[i]
+                    break
+            if not located_items:
+                del index[key]
+
+    def find_document_items(self, item: Item) -> List[Tuple[Section, Item]]:
+        """
+        :return: (Section, Item) for each Item in the journal matching item according to the Section.find_item()
+            criteria, in journal order.
+        """
+        self.build_item_index()
+        sth = item.get_saved_title_hash()
+        located_items = list(self.items_by_saved_hash.get(sth, ())) if sth else []
+        located_items.extend(self.items_by_title.get(item.get_title(), ()))
+        if len(located_items) > 1:
+            located_items.sort(key=lambda located: (self.section_order[id(located[0])],
+                                                    located[0].item_position(located[1])))
+        return located_items
+
+    def get_sections_by_header(self, section_heading: str) -> List[Section]:
+        """:return: the journal Sections with header section_heading, in journal order"""
+        if self.sections_by_header is None:
+            self.sections_by_header = {}
+            for section in self.journal:
+                self.sections_by_header.setdefault(section.header, []).append(section)
+        return self.sections_by_header.get(section_heading, [])
+
     @classmethod
     def fromtext(cls, text):
         """create a Document from multiline text parameter"""
@@ -383,6 +492,24 @@ class BlotterDocument:
         new_document.add_lines(lines)
         return new_document
 
+    def as_encodable(self):
+        """Return the journal Sections as python structures that the json module or other serializers can encode"""
+        return [section.as_encodable() for section in self.journal]
+
+    @staticmethod
+    def obj_from_encodable(data) -> 'BlotterDocument':
+        """
+        Rebuild a BlotterDocument from the structure returned by as_encodable() without re-parsing any text.
+        Used to restore cached or transferred documents.
+        """
+        new_document = BlotterDocument()
+        if data:
+            new_document.journal = [Section.obj_from_encodable(encoded_section, top_parser_pat)
+                                    for encoded_section in data]
+            new_document.current_section = new_document.journal[-1]
+            new_document.last_data_section_add = new_document.current_section
+        return new_document
+
     # todo test this.
     def get_doc_attrib(self, key):
         """
@@ -407,15 +534,32 @@ class BlotterDocument:
             s = Section(top_parser_pat)
             s.set_sec_attrib(akey, aval)
             self.journal.insert(0, s)
+            self.sections_by_header = None  # the new Section goes first in journal order
+            self._index_new_section(head=True)
 
     def journal_str(self):
         "Return the journal as text lines"
-        s = ""
+        return "".join(self.journal_parts())
+
+    def journal_parts(self):
+        """
+        Generate the strings that journal_str() joins, in one pass over the journal.
+        A newline separates each Section that has text from the text before it.
+        """
+        wrote_text = False
         for section in self.journal:
-            sec_str = str(section)
-            sec_newline = "\n" if s and sec_str else ""
-            s += sec_newline + sec_str
-        return s
+            sec_newline = "\n" if wrote_text else ""
+            for part in section.str_parts():
+                if part:
+                    if sec_newline:
+                        yield sec_newline
+                        sec_newline = ""
+                    wrote_text = True
+                yield part
+
+    def write_to(self, fp):
+        """Write str(self) to the text file object fp without building the whole string"""
+        fp.writelines(self.journal_parts())
 
     # def in_progress_str(self):
     #     "Return the in_progress section as a string."
@@ -521,13 +665,24 @@ class BlotterDocument:
         assume only 1 removal is required because items should not be duplicated in a BlotterDocument
         return: self
         """
-        section: Section
-        for section in self.journal:
-            if section.find_item(item):
-                section.remove_item(item)
+        removed_from = []
+        for section, body_item in self.find_document_items(item):
+            if section not in removed_from:  # only the first match in each Section, like Section.remove_item()
+                removed_from.append(section)
+                section.remove_body_item(body_item)
         # self.backlog.remove_item(item)
         return self
 
+    def remove_document_items(self, items: List[Item]):
+        """
+        Remove each of items from self according to remove_document_item().
+        Lets a caller apply many removals to a story with one parse and one write.
+        return: self
+        """
+        for item in items:
+            self.remove_document_item(item)
+        return self
+
 
     def insert_update_document_item(self, item, default_section_heading="# New items"):
         """
@@ -536,14 +691,10 @@ class BlotterDocument:
             if a match is found, replace the matched Item with item.
         return: self
         """
-        matching_item = None
-        section: Section
-        for section in self.journal:
-            matching_item = section.find_item(item) #.find_replace_item_by_titleHash(item)
-            if matching_item:
-                break
-        if matching_item:
-            matching_item.merge_parts(item) # item reference in the current section iteration from above loop.
+        located_items = self.find_document_items(item)
+        if located_items:
+            section, matching_item = located_items[0]
+            matching_item.merge_parts(item)
         else:
             self.insert_new_item_into_journal_section(default_section_heading, item)
         return self
@@ -554,10 +705,9 @@ class BlotterDocument:
         Create a matching the section if necessary.
         """
         added_item: bool = False
-        for section in self.journal:
-            if section.header == section_heading:
-                section.add_item(item, head_insert=True) # todo, make head_insert behavior part of the Section creation
-                added_item = True
+        for section in list(self.get_sections_by_header(section_heading)):
+            section.add_item(item, head_insert=True) # todo, make head_insert behavior part of the Section creation
+            added_item = True
         if not added_item:
             new_section: Section = self.add_section_from_line(section_heading)
             new_section.add_item(item, head_insert=True) # todo, make head_insert behavior part of the Section
@@ -9,21 +9,23 @@ from __future__ import annotations
 import json
 import os
 import re
-from typing import List, NamedTuple
+from typing import List, NamedTuple, Dict
 
 # import mongocol
 import tlconst
 from endeavor import Endeavor, Story, Task, EffortDomain
+import fsendeavor
 from fsendeavor import FileSystemDomain, load_doc_from_file, FileSystemEndeavor
 from tlconst import apCfg
 from tldocument import BlotterDocument  # import re
 import tldocument
-from docsec import TLogInternalException, Item
 import fileinput
+from docsec import TLogInternalException, Item
 from journaldir import StoryDir
 import journaldir
 from docsec import SectionSortDoc
-# import sys
+from runstats import run_stats
+import sys
 import logging
 
 
@@ -62,48 +64,105 @@ import logging
 #         return "\n".join([str(d) for d in self.story_docs])
 
 
-def remove_item_from_story_file(item: Item) -> Item:
+def remove_item_from_story_file(item: Item, endeavor_path=None) -> Item:
     """
     Remove item from file indicated by it's 'storySource:' attribute
     always log the item being removed.
     """
+    remove_items_from_story_files([item], endeavor_path)
+
+
+def remove_items_from_story_files(items: List[Item], endeavor_path=None) -> Dict[str, BlotterDocument]:
+    """
+    Bulk remove_item_from_story_file(): items are bucketed by their 'storySource:' attribute so each
+    story file is loaded once, has all of its matching items removed, and is written once.
+    Items without a 'storySource:' are logged and skipped.
+    :param endeavor_path: Endeavors directory that relative 'storySource:' values are resolved against,
+        see fsendeavor.resolve_story_source()
+    :return: dict of file path -> Story Document object that was written to disk
+    """
     debuglog = logging.getLogger('debuglog')
+    story_file_items: Dict[str, List[Item]] = {}
+    for item in items:
+        story_source = item.get_item_attrib(FileSystemEndeavor.story_source_attr_name)
+        if not story_source:
+            debuglog.warning(f"item to remove does not have a 'storySource:' attribute: {item.top}")
+            continue
+        story_file_items.setdefault(fsendeavor.resolve_story_source(story_source, endeavor_path), []).append(item)
+
+    story_docs: Dict[str, BlotterDocument] = {}
+    for filepath, file_items in story_file_items.items():
+        story_tldoc: BlotterDocument = load_doc_from_file(filepath)
+        story_tldoc.remove_document_items(file_items)
+        journaldir.write_filepath(story_tldoc, filepath)
+        story_docs[filepath] = story_tldoc
+    return story_docs
+
+
+def story_file_for_item(item: Item, default_file=None, endeavor_path=None) -> str:
+    """
+    Return the story file path an item belongs in: its 'storySource:' attribute, or default_file.
+    If the item has no 'storySource:', it is set to default_file so the item can find its way back later.
+    A relative 'storySource:' is resolved against endeavor_path, see fsendeavor.resolve_story_source()
+    """
+    tag = "story_file_for_item():"
     story_source = item.get_item_attrib(FileSystemEndeavor.story_source_attr_name)
-    if not story_source:
-        debuglog.warning(f"item to remove does not have a 'storySource:' attribute: {item.top}")
-        return None
-    filepath = story_source
-    story_tldoc: BlotterDocument = load_doc_from_file(filepath)
-    story_tldoc.remove_document_item(item)
-    journaldir.write_filepath(str(story_tldoc), filepath)
+    if story_source:
+        return fsendeavor.resolve_story_source(story_source, endeavor_path)
+    if default_file:
+        item.set_attrib(FileSystemEndeavor.story_source_attr_name,
+                        fsendeavor.encode_story_source(default_file, endeavor_path=endeavor_path))
+        return default_file
+    raise TLogInternalException(
+        f"{tag} Do not have file to write to for ({item.top}). missing {FileSystemEndeavor.story_source_attr_name}"
+        f"and no default has been provided")
+
+
+def group_items_by_story_file(items: List[Item], default_file=None, endeavor_path=None) -> Dict[str, List[Item]]:
+    """
+    Bucket items by the story file they belong in according to story_file_for_item().
+    The dict keeps the order files are first seen, and each list keeps the order of items.
+    """
+    story_file_items: Dict[str, List[Item]] = {}
+    for item in items:
+        filepath = story_file_for_item(item, default_file, endeavor_path)
+        story_file_items.setdefault(filepath, []).append(item)
+    return story_file_items
 
 
 # todo test write_item_to_story_file()
-def write_item_to_story_file(item: Item, default_file=None, new_item_section_head: str = "# Added Tasks"):
+def write_item_to_story_file(item: Item, default_file=None, new_item_section_head: str = "# Added Tasks",
+                             endeavor_path=None):
     """
     Writes an item into either its original storySource, or the default if not provided.
     :param item: a task item to write.
     :param default_file: file path to write item into if there is no storySource in item
+    :param endeavor_path: Endeavors directory that a relative storySource is resolved against
     :return: Story Document object that was written to disk
     """
-    tag = "write_item_to_story_file():"
-    story_source = item.get_item_attrib(FileSystemEndeavor.story_source_attr_name)
-    filepath = default_file
-    if story_source:
-        filepath = story_source
-    else:
-        if default_file:
-            item.set_attrib(FileSystemEndeavor.story_source_attr_name, default_file)
-        else:
-            raise TLogInternalException(
-                f"{tag} Do not have file to write to for ({item.top}). missing {FileSystemEndeavor.story_source_attr_name}"
-                f"and no default has been provided")
+    story_docs = write_items_to_story_files([item], default_file, new_item_section_head, endeavor_path)
+    return next(iter(story_docs.values()))  # the one story file the item was written to
 
-    # get the story contents from disk and insert / update the item.
-    story_tldoc: BlotterDocument = load_doc_from_file(filepath)
-    story_tldoc.insert_update_document_item(item, new_item_section_head)
-    journaldir.write_filepath(str(story_tldoc), filepath)
-    return story_tldoc
+
+def write_items_to_story_files(items: List[Item], default_file=None, new_item_section_head: str = "# Added Tasks",
+                               endeavor_path=None) -> Dict[str, BlotterDocument]:
+    """
+    Batched write_item_to_story_file(): items are grouped by 'storySource:' (or default_file), then each
+    story file is loaded once, has all of its items inserted / updated in order, and is written once.
+    :param items: task items to write.
+    :param default_file: file path to write items into if there is no storySource in an item
+    :param endeavor_path: Endeavors directory that relative storySource values are resolved against
+    :return: dict of file path -> Story Document object that was written to disk
+    """
+    story_docs: Dict[str, BlotterDocument] = {}
+    for filepath, file_items in group_items_by_story_file(items, default_file, endeavor_path).items():
+        # get the story contents from disk and insert / update the items.
+        story_tldoc: BlotterDocument = load_doc_from_file(filepath)
+        for item in file_items:
+            story_tldoc.insert_update_document_item(item, new_item_section_head)
+        journaldir.write_filepath(story_tldoc, filepath)
+        story_docs[filepath] = story_tldoc
+    return story_docs
 
 from enum import Enum
 
@@ -126,7 +185,19 @@ class SearchResult(NamedTuple):
     message: str
 
 
-def find_prev_journal_dir(latest_dir, history_months) -> SearchResult:
+def find_prev_journal_dir(latest_dir, history_months, journal_index: journaldir.JournalIndex = None) -> SearchResult:
+    """
+    Find the most recent journal month dir with stories or blotters, from latest_dir back through history_months.
+    With a journal_index, the dir is looked up in the index rather than searched for month by month.
+    """
+    if journal_index and journal_index.month_key(latest_dir):
+        found = journal_index.find_latest_month_dir(latest_dir, history_months)
+        if not found:
+            return SearchResult(SearchStatus.STOP, latest_dir,
+                                f"No previous Journal Dir was found looking back {history_months} months.")
+        search_dir, sfl, jfl = found
+        return SearchResult(SearchStatus.SUCCESS, search_dir,
+                            f"{len(sfl)} stories and {len(jfl)} blotters in {search_dir}")
     file_count = 0
     dirs_to_search = history_months
     next_search_dir = latest_dir
@@ -135,10 +206,7 @@ def find_prev_journal_dir(latest_dir, history_months) -> SearchResult:
                           f"No previous Journal Dir was found looking back {history_months} months.")
     while file_count == 0 and dirs_to_search > 0:
         search_dir = next_search_dir
-        sfl = journaldir.get_file_names_by_pattern(
-            search_dir, apCfg.story_pat)
-        jfl = journaldir.get_file_names_by_pattern(
-            search_dir, apCfg.blotter_pat)
+        sfl, jfl = journaldir.scan_dir_files(search_dir, [apCfg.story_pat, apCfg.blotter_pat])
         file_count = len(sfl) + len(jfl)
         if file_count > 0:
             result = SearchResult(SearchStatus.SUCCESS, search_dir,
@@ -186,13 +254,14 @@ def initialize_file_paths():
     info_handler = logging.StreamHandler()
     info_handler.setLevel(logging.INFO)
     debuglog.addHandler(info_handler)
-    user_path_o.git_init_journal()
+    if apCfg.git_commits_per_run > 0:  # otherwise GitPython is not even imported
+        user_path_o.git_init_journal()
     return daily_o, debuglog, user_path_o
 
 
 # todo - replace this method with 2 methods:
 #    a method that builds the new blotter with a scrum that has all the previously resolved 'x - '
-def write_resolved_tasks(daily_o: journaldir.Daily, old_jtd_doc: object) -> object:
+def write_resolved_tasks(daily_o: journaldir.Daily, old_jtd_doc: object, endeavor_path=None) -> object:
     """
     Get a new blotter doc started, with '/ -'.
     Include 'x -' and 'a -' in the new blotter for next steps in main()
@@ -218,7 +287,7 @@ def write_resolved_tasks(daily_o: journaldir.Daily, old_jtd_doc: object) -> obje
     xa_resolved_items = old_jtd_doc.select_all_section_items_by_pattern(
         tldocument.resolved_pat)  # items in blotter that are resolved (xa)
     new_blotter_doc.add_list_items_to_scrum(xa_resolved_items) # puts xa_resolved_items in the resolved Section
-    [remove_item_from_story_file(r_item) for r_item in xa_resolved_items]
+    remove_items_from_story_files(xa_resolved_items, endeavor_path)  # one load and write per story file
 
     resolved_data = str(new_blotter_doc.scrum.head_instance_dict[new_blotter_doc.resolved_section_head])
     print("resolved_data:", resolved_data)
@@ -236,15 +305,17 @@ def write_resolved_tasks(daily_o: journaldir.Daily, old_jtd_doc: object) -> obje
 
 
 def update_endeavors(daily_o, last_journal_message_string, old_blotter_doc, resolved_items, user_path_o):
-    for story_item in old_blotter_doc.get_document_matching_list(tldocument.unresolved_pat):
-        write_item_to_story_file(story_item, user_path_o.new_task_story_file)
-    for story_item in old_blotter_doc.get_document_matching_list(tldocument.scheduled_pat):
-        write_item_to_story_file(story_item, user_path_o.new_task_story_file)
-    user_path_o.git_add_all(daily_o, f"data written to stories and resolved file from {last_journal_message_string}")
+    story_items: List[Item] = old_blotter_doc.get_document_matching_list(tldocument.unresolved_pat)
+    story_items += old_blotter_doc.get_document_matching_list(tldocument.scheduled_pat)
+    write_items_to_story_files(story_items, user_path_o.new_task_story_file,  # each story file written once
+                               endeavor_path=user_path_o.endeavor_path)
+    if apCfg.git_commits_per_run > 1:
+        user_path_o.git_commit_written(
+            daily_o, f"data written to stories and resolved file from {last_journal_message_string}")
     # [remove_item_from_story_file(r_item) for r_item in resolved_items]
 
 
-def load_task_data(daily_o, user_path_o)-> SearchResult:
+def load_task_data(daily_o, user_path_o, journal_index: journaldir.JournalIndex = None)-> SearchResult:
     old_blotter_doc = BlotterDocument(day=daily_o.domth)
 
     os.makedirs(daily_o.j_month_dir, exist_ok=True)  # make the dir for the current blotter file
@@ -252,7 +323,7 @@ def load_task_data(daily_o, user_path_o)-> SearchResult:
     os.makedirs(os.path.join(user_path_o.endeavor_path, apCfg.default_endeavor_name),
                 exist_ok=True)  # dir default an_endeavor
     # look back in history to find past journal dir
-    find_prev_result = find_prev_journal_dir(daily_o.j_month_dir, tlconst.apCfg.look_back_months)
+    find_prev_result = find_prev_journal_dir(daily_o.j_month_dir, tlconst.apCfg.look_back_months, journal_index)
     status, prev_journal_dir, message = find_prev_result
     if status == SearchStatus.SUCCESS:
         story_dir_o = StoryDir(prev_journal_dir)
@@ -304,13 +375,16 @@ def main():
     """
 
     # initialize everything
+    run_stats.phase("initialize")
     daily_o, debuglog, user_path_o = initialize_file_paths()
 
     # ############################
     # Gather input state from Disk and command line
     # ============================
     #     1. Load the "old" blotter file.
-    task_load_result: SearchResult = load_task_data(daily_o, user_path_o)
+    run_stats.phase("load blotter")
+    journal_index = journaldir.JournalIndex(daily_o.jroot, user_path_o.journal_index_file)
+    task_load_result: SearchResult = load_task_data(daily_o, user_path_o, journal_index)
 
     #     2. Get a new blotter doc started, with '/ -'.
     #         still need the 'x -' and 'a -' to clear them out of the source Endeavors stories.
@@ -322,13 +396,15 @@ def main():
         assert isinstance(task_load_result.data, tldocument.BlotterDocument), \
             "Prior task contents should have been loaded into a tldocument.BlotterDocument"
         old_blotter_doc = task_load_result.data
-        new_blotter_doc = write_resolved_tasks(daily_o, old_blotter_doc)
+        run_stats.phase("write resolved")
+        new_blotter_doc = write_resolved_tasks(daily_o, old_blotter_doc, user_path_o.endeavor_path)
         resolved_items = new_blotter_doc.scrum.head_instance_dict[new_blotter_doc.resolved_section_head].body_items
 
         #     4. Write everything in old blotter back to Endeavor stories on disk, merging according to the
         #           write_item_to_story_file() doc string.
         #     5. Git commit the updates, which will include tasks updated to 'x -' and 'a -'.
         #     6. Remove resolved items from stories using remove_item_from_story_file(r_item).
+        run_stats.phase("update endeavors")
         update_endeavors(daily_o, task_load_result.message, old_blotter_doc, resolved_items, user_path_o)
     else:
         print(task_load_result.message)
@@ -338,7 +414,10 @@ def main():
 
     # the FileSystemDomain is a data access object for getting the
     # domain data out of the file system.
+    run_stats.phase("load endeavors")
     fs_domain = FileSystemDomain(user_path_o)
+    debuglog.debug(str(fsendeavor.story_write_counts))
+    debuglog.debug(str(fs_domain.doc_cache))
 
     story_docs_from_all_endeavors: List[BlotterDocument] = []
     endeavor_models: List[Endeavor] = []
@@ -347,6 +426,7 @@ def main():
         story_docs_from_all_endeavors += fse.story_docs  # legacy functionality to replace with logic in the domain model EffortDomain
 
     # non have the domain an a model class!
+    run_stats.phase("build sprint")
     effort_domain: EffortDomain = fs_domain.as_domain()
     sprint_domain: EffortDomain = effort_domain.get_sprints(1)
     journaldir.write_filepath(sprint_domain.str_medium(), user_path_o.sprint_log_file)
@@ -385,16 +465,20 @@ def main():
                                                                 # to put these in based on the leader pattern
 
     # 10. Move existing blotter files out of the journaldir
+    run_stats.phase("move blotters")
     blotter_file_list = journaldir.get_file_names_by_pattern(daily_o.j_month_dir, apCfg.blotter_pat)
     if len(blotter_file_list) > 0:
         journaldir.move_files(user_path_o.old_journal_dir, blotter_file_list)
 
     # 11. Persist the scrum td and sched
     # todo new_scrum is just a reference to new_blotter_doc.scrum.   I doubt that is what I mean to do.
+    run_stats.phase("write blotter")
     new_scrum: SectionSortDoc = new_blotter_doc.scrum
     blotter_data: str = new_scrum.get_report_str([new_blotter_doc.blotter_section_head,
                                                   new_blotter_doc.scheduled_section_head])
     journaldir.write_dir_file(blotter_data + '\n', daily_o.j_month_dir, daily_o.cday_blotter_fname)
+    journal_index.index_month_dir(daily_o.j_month_dir)  # blotters were moved out and today's written
+    journal_index.save()
     blotter_tasks = new_blotter_doc.scrum.head_instance_dict[new_blotter_doc.blotter_section_head]
 
     debug_msg = "Sprint Items: \n"
@@ -404,8 +488,14 @@ def main():
         index += 1
     debuglog.debug(debug_msg)
 
+    run_stats.phase("sync")
+    journaldir.deferred_sync.sync()  # if apCfg.write_fsync put off syncing the files written until now
+
     # 12. Git commit the updates, which will have both parts of the new scrum and the updated Endeavor stories with
-    user_path_o.git_add_all(daily_o, f"task blotter sprint written to {daily_o.cday_blotter_fname}")
+    run_stats.phase("git commit")
+    if apCfg.git_commits_per_run > 0:
+        user_path_o.git_commit_written(daily_o, f"task blotter sprint written to {daily_o.cday_blotter_fname}")
+    run_stats.end_phase()
 
     msg1 = f"total Backlog: {num_sprint_candidates} configured sprint_size: {sprint_size} sprint items: "
     msg1 += f"{len(blotter_tasks.get_body_data())}"
@@ -414,7 +504,22 @@ def main():
     debuglog.debug(msg2)
     print(msg1)
     print(msg2)
+    run_stats.append_to(user_path_o.run_stats_file)
+
+
+def profile_main(profile_file):
+    """Run main() under cProfile, saving the pstats to profile_file"""
+    import cProfile
+    profiler = cProfile.Profile()
+    try:
+        profiler.runcall(main)
+    finally:
+        profiler.dump_stats(profile_file)
+        print("Tlog profile: ", profile_file)
 
 
 if __name__ == "__main__":
-    main()
+    if "--profile" in sys.argv[1:]:
+        profile_main(journaldir.UserPaths().profile_file)
+    else:
+        main()